@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from serviceLink.geo import locate
+
 class ProfileUser(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     img = models.ImageField(upload_to='profile/', null=True, blank=True)
@@ -9,8 +11,17 @@ class ProfileUser(models.Model):
     prenom = models.CharField(max_length=150, null=True, blank=True)
     phone = models.CharField(max_length=20)
     location = models.CharField(max_length=150, null=True, blank=True)
+    # Resolved from `location` by the offline gazetteer on save (serviceLink.geo)
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False, db_index=True)
     bio = models.TextField(blank=True, null=True, max_length=500)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
+
+    def save(self, *args, **kwargs):
+        locate(self)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.user.username} - {self.nom} - {self.prenom} "
\ No newline at end of file
@@ -1,11 +1,17 @@
 from rest_framework import serializers
 from .models import ProfileUser
+from serviceLink.thumbnails import variant_urls
 
 
 class ProfileUserSerializer(serializers.ModelSerializer):
+    img_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = ProfileUser
-        fields = ['id','img','age', 'nom', 'prenom', 'phone', 'location', 'bio']
+        fields = ['id','img','img_variants','age', 'nom', 'prenom', 'phone', 'location', 'bio']
+
+    def get_img_variants(self, obj):
+        return variant_urls(obj.img)
 
     def validate(self, data):
         if not data.get("phone"):
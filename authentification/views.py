@@ -12,6 +12,7 @@ from .utils import send_code_to_phone,generate_verification_code
 from rest_framework_simplejwt.tokens import RefreshToken
 from .models import ProfileUser
 from .serializers import ProfileUserSerializer
+from serviceLink.thumbnails import schedule_variants
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -194,5 +195,7 @@ def update_profile(request):
     serializer = ProfileUserSerializer(profile, data=request.data, partial=True)
     if serializer.is_valid():
         serializer.save()
+        if 'img' in serializer.validated_data and profile.img:
+            schedule_variants(profile.img.name)
         return Response(serializer.data, status=status.HTTP_200_OK)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
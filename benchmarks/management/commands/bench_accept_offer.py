@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.test import APIClient
+
+from provider.models import Provider
+from service.models import Order, Service, offer
+
+
+class Command(BaseCommand):
+    help = "Hammer accept_offer from many threads and check that each order is accepted exactly once."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=100)
+        parser.add_argument('--threads', type=int, default=8)
+
+    def handle(self, *args, **options):
+        service = Service.objects.create(name='bench-accept', description='benchmark')
+        client_user = User.objects.create(username='bench-accept-client')
+        try:
+            providers = [
+                Provider.objects.create(
+                    user=User.objects.create(username=f'bench-accept-provider-{i}'),
+                    service=service, location='Tunis', cin=f'bench-accept-{i}',
+                )
+                for i in range(options['threads'])
+            ]
+            orders = Order.objects.bulk_create(
+                Order(
+                    client=client_user, service=service, title='Benchmark order',
+                    description='Benchmark order description', location='Tunis',
+                    proposed_price_range_min=Decimal('10'), proposed_price_range_max=Decimal('100'),
+                    final_price=Decimal('10'),
+                )
+                for _ in range(options['orders'])
+            )
+            offers = offer.objects.bulk_create(
+                offer(provider=provider, Order=order, proposed_price=Decimal('50'))
+                for order in orders for provider in providers
+            )
+            offer_ids = {(o.Order_id, o.provider_id): o.id for o in offers}
+
+            statuses = Counter()
+            lock = threading.Lock()
+            barrier = threading.Barrier(len(providers))
+
+            def worker(provider):
+                client = APIClient(SERVER_NAME='localhost')
+                client.force_authenticate(provider.user)
+                barrier.wait()
+                try:
+                    for order in orders:
+                        response = client.post('/service/accept_offer/', {
+                            'order_id': order.id,
+                            'offer_id': offer_ids[(order.id, provider.id)],
+                        }, format='json')
+                        with lock:
+                            statuses[response.status_code] += 1
+                finally:
+                    connection.close()
+
+            threads = [threading.Thread(target=worker, args=(provider,)) for provider in providers]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+            accepted = Order.objects.filter(id__in=[o.id for o in orders], state='accepted').count()
+            total = sum(statuses.values())
+            self.stdout.write(f"{total} requests in {elapsed:.2f} s ({total / elapsed:.0f} req/s), statuses {dict(statuses)}")
+            self.stdout.write(f"orders accepted: {accepted}/{len(orders)}, successful accepts: {statuses[200]}")
+            if statuses[200] != len(orders) or accepted != len(orders):
+                self.stdout.write(self.style.ERROR("Lost or duplicated transitions detected."))
+            else:
+                self.stdout.write(self.style.SUCCESS("Every order was accepted exactly once."))
+        finally:
+            service.delete()
+            User.objects.filter(username__startswith='bench-accept').delete()
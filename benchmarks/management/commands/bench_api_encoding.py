@@ -0,0 +1,92 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from chat.models import ChatRoom, Message
+from provider.models import Provider
+from service.models import Order, Service, offer
+from serviceLink.renderers import ORJSONRenderer
+
+
+class Command(BaseCommand):
+    help = "Benchmark JSON rendering (DRF vs orjson) and bytes on the wire per Accept-Encoding."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200)
+        parser.add_argument('--offers-per-order', type=int, default=5)
+        parser.add_argument('--messages', type=int, default=200)
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        service = Service.objects.create(name='bench-encoding', description='benchmark')
+        client_user = User.objects.create(username='bench-enc-client')
+        try:
+            room = self.seed(service, client_user, options)
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(client_user)
+            page_size = max(options['orders'], options['messages'])
+            for url in (
+                f'/service/list_orders/?page_size={page_size}',
+                f'/chat/messages/{room.id}/?page_size={page_size}',
+            ):
+                self.stdout.write(self.style.MIGRATE_HEADING(url))
+                data = client.get(url).data
+                for label, renderer in (('DRF JSONRenderer', JSONRenderer()), ('ORJSONRenderer', ORJSONRenderer())):
+                    timings = []
+                    for _ in range(options['runs']):
+                        start = time.perf_counter()
+                        renderer.render(data, 'application/json')
+                        timings.append(time.perf_counter() - start)
+                    timings.sort()
+                    self.stdout.write(f"{label:>17}: render median {timings[len(timings) // 2] * 1000:.2f} ms")
+                for accept in ('identity', 'gzip', 'br'):
+                    timings = []
+                    for _ in range(options['runs']):
+                        start = time.perf_counter()
+                        response = client.get(url, HTTP_ACCEPT_ENCODING=accept)
+                        timings.append(time.perf_counter() - start)
+                    timings.sort()
+                    self.stdout.write(
+                        f"{accept:>17}: {len(response.content):>8} B on the wire "
+                        f"(Content-Encoding: {response.get('Content-Encoding', '-')}), "
+                        f"request median {timings[len(timings) // 2] * 1000:.2f} ms"
+                    )
+        finally:
+            service.delete()
+            ChatRoom.objects.filter(name='bench-encoding').delete()
+            User.objects.filter(username__startswith='bench-enc-').delete()
+
+    def seed(self, service, client_user, options):
+        providers = []
+        for i in range(options['offers_per_order']):
+            user = User.objects.create(username=f'bench-enc-provider-{i}')
+            providers.append(Provider.objects.create(user=user, service=service, location='Tunis', cin=f'bench-enc-{i}'))
+        orders = Order.objects.bulk_create(
+            Order(
+                client=client_user,
+                service=service,
+                title=f'Benchmark order {i}',
+                description='Réparation d\'une fuite sous l\'évier de la cuisine, intervention rapide souhaitée.',
+                location='La Marsa, Tunis',
+                proposed_price_range_min=Decimal('10'),
+                proposed_price_range_max=Decimal('100'),
+                final_price=Decimal('10'),
+            )
+            for i in range(options['orders'])
+        )
+        offer.objects.bulk_create(
+            offer(provider=provider, Order=order, proposed_price=Decimal(40 + i), description='Disponible demain matin.')
+            for order in orders
+            for i, provider in enumerate(providers)
+        )
+        room = ChatRoom.objects.create(name='bench-encoding')
+        room.participants.add(client_user, providers[0].user)
+        Message.objects.bulk_create(
+            Message(chat_room=room, sender=client_user if i % 2 else providers[0].user, content=f'Message {i} : bonjour, je confirme le rendez-vous.')
+            for i in range(options['messages'])
+        )
+        return room
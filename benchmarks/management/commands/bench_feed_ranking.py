@@ -0,0 +1,134 @@
+import math
+import random
+import time
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from provider.models import Provider
+from service.models import Order, Service, offer
+from service.ranking import ServiceFeatures, rank_feed, score, top_k, typical_price
+from serviceLink.gazetteer import PLACES
+from serviceLink.geo import encode, haversine_km
+
+
+class Command(BaseCommand):
+    help = "Benchmark relevance ranking of the provider feed (per-row Python loop vs one NumPy pass)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=100_000)
+        parser.add_argument('--offer-ratio', type=float, default=0.3)
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--k', type=int, default=20)
+        parser.add_argument('--keep', action='store_true', help="Keep the generated rows.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Seeding {options['orders']} pending orders...")
+        service, providers = self.seed(options)
+        provider, k = providers[0], options['k']
+        try:
+            start = time.perf_counter()
+            features = ServiceFeatures.load(service.id)
+            self.stdout.write(f"feature load (cold cache): {(time.perf_counter() - start) * 1000:.1f} ms for {len(features)} rows")
+
+            price = typical_price(provider, features)
+            now = timezone.now().timestamp()
+            mask = np.isin(features.confirmed_provider, (0, provider.id))
+
+            def vectorized():
+                scores, _ = score(features, now, price=price, latitude=provider.latitude, longitude=provider.longitude)
+                return features.ids[top_k(features, scores, mask, k)].tolist()
+
+            def python_loop():
+                return self.python_ranking(features, now, price, provider, k)
+
+            assert vectorized() == python_loop(), "Rankings differ"
+            for label, function, runs in (
+                ('per-row Python loop', python_loop, max(options['runs'] // 5, 3)),
+                ('vectorized NumPy pass', vectorized, options['runs']),
+                ('rank_feed() (warm cache, with DB re-check)', lambda: rank_feed(provider, k=k), options['runs']),
+            ):
+                self.stdout.write(self.style.MIGRATE_HEADING(label))
+                self.report([self.time(function) for _ in range(runs)])
+        finally:
+            if not options['keep']:
+                service.delete()
+                User.objects.filter(username__startswith='bench-rank-').delete()
+
+    def time(self, function):
+        start = time.perf_counter()
+        function()
+        return time.perf_counter() - start
+
+    def report(self, timings):
+        timings.sort()
+        self.stdout.write(
+            f"median {timings[len(timings) // 2] * 1000:.2f} ms, "
+            f"p95 {timings[max(int(len(timings) * 0.95) - 1, 0)] * 1000:.2f} ms"
+        )
+
+    def python_ranking(self, features, now, price, provider, k):
+        """Same formula as service.ranking.score(), one row at a time."""
+        from django.conf import settings
+        from service.ranking import DEFAULT_WEIGHTS, NEUTRAL_SCORE
+
+        weights = getattr(settings, 'RANKING_WEIGHTS', DEFAULT_WEIGHTS)
+        scale = getattr(settings, 'RANKING_DISTANCE_SCALE_KM', 10)
+        half_life = getattr(settings, 'RANKING_RECENCY_HALF_LIFE_HOURS', 48) * 3600
+        rows = []
+        for i in range(len(features)):
+            if features.confirmed_provider[i] not in (0, provider.id):
+                continue
+            gap = max(features.price_min[i] - price, 0) + max(price - features.price_max[i], 0)
+            price_score = math.exp(-gap / max(price, 1.0))
+            if math.isnan(features.latitude[i]):
+                distance_score = NEUTRAL_SCORE
+            else:
+                distance = haversine_km(provider.latitude, provider.longitude, features.latitude[i], features.longitude[i])
+                distance_score = math.exp(-distance / scale)
+            recency_score = 2 ** (-max(now - features.created_at[i], 0) / half_life)
+            value = (
+                weights['price'] * price_score + weights['distance'] * distance_score
+                + weights['recency'] * recency_score + weights['competition'] / (1 + features.offer_count[i])
+            )
+            rows.append((-value, -features.created_at[i], int(features.ids[i])))
+        rows.sort()
+        return [order_id for _, _, order_id in rows[:k]]
+
+    @transaction.atomic
+    def seed(self, options):
+        rng = random.Random(42)
+        service = Service.objects.create(name='bench-ranking', description='benchmark')
+        client = User.objects.create(username='bench-rank-client')
+        providers = []
+        for i in range(20):
+            user = User.objects.create(username=f'bench-rank-provider-{i}')
+            providers.append(Provider.objects.create(
+                user=user, service=service, location=rng.choice(list(PLACES)), cin=f'bench-rank-{i}',
+            ))
+
+        places = list(PLACES.values())
+        batch = 10_000
+        for start in range(0, options['orders'], batch):
+            orders = []
+            for _ in range(min(batch, options['orders'] - start)):
+                low = rng.randrange(10, 500)
+                latitude, longitude = rng.choice(places)
+                latitude, longitude = latitude + rng.uniform(-0.05, 0.05), longitude + rng.uniform(-0.05, 0.05)
+                orders.append(Order(
+                    client=client, service=service,
+                    title='Benchmark order', description='Benchmark order description', location='Tunisie',
+                    latitude=latitude, longitude=longitude, geohash=encode(latitude, longitude),
+                    proposed_price_range_min=Decimal(low), proposed_price_range_max=Decimal(low + rng.randrange(10, 300)),
+                    final_price=Decimal('0'),
+                ))
+            orders = Order.objects.bulk_create(orders)
+            offer.objects.bulk_create(
+                offer(provider=rng.choice(providers[1:]), Order=o, proposed_price=Decimal(rng.randrange(20, 600)))
+                for o in orders if rng.random() < options['offer_ratio']
+            )
+        return service, providers
@@ -0,0 +1,106 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from provider.models import Provider
+from service import feed
+from service.archive import archive_orders
+from service.models import ArchivedOrder, Order, Service, offer
+
+
+class Command(BaseCommand):
+    help = "Benchmark hot-table size and order listing/feed times before and after archival."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=50_000)
+        parser.add_argument('--terminal-ratio', type=float, default=0.8)
+        parser.add_argument('--offer-ratio', type=float, default=0.5)
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Seeding {options['orders']} orders...")
+        service, client_user, provider = self.seed(options)
+        try:
+            feed.sync_provider(provider)
+            clients = {}
+            for user in (client_user, provider.user):
+                clients[user] = APIClient(SERVER_NAME='localhost')
+                clients[user].force_authenticate(user)
+            urls = (
+                (client_user, '/service/list_orders/?page_size=50'),
+                (client_user, '/service/list_orders/?page_size=50&include_archived=true'),
+                (provider.user, '/service/list_provider_available_orders/?page_size=50'),
+            )
+
+            for label in ('before archival', 'after archival'):
+                if label == 'after archival':
+                    start = time.perf_counter()
+                    archived = sum(counts[0] for counts in archive_orders(retention_days=30))
+                    self.stdout.write(f"Archived {archived} orders in {time.perf_counter() - start:.2f} s")
+                self.stdout.write(self.style.MIGRATE_HEADING(label))
+                self.stdout.write(self.table_sizes())
+                for user, url in urls:
+                    timings = []
+                    for _ in range(options['runs']):
+                        start = time.perf_counter()
+                        clients[user].get(url)
+                        timings.append(time.perf_counter() - start)
+                    timings.sort()
+                    self.stdout.write(f"{url}: median {timings[len(timings) // 2] * 1000:.2f} ms")
+        finally:
+            ArchivedOrder.objects.filter(service=service).delete()
+            service.delete()
+            User.objects.filter(username__startswith='bench-archive-').delete()
+
+    def table_sizes(self):
+        sizes = f"service_order: {Order.objects.count()} rows, service_offer: {offer.objects.count()} rows"
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_size_pretty(pg_total_relation_size('service_order')), "
+                    "pg_size_pretty(pg_total_relation_size('service_offer'))"
+                )
+                sizes += " (%s, %s with indexes)" % cursor.fetchone()
+        return sizes
+
+    @transaction.atomic
+    def seed(self, options):
+        service = Service.objects.create(name='bench-archive', description='benchmark')
+        client_user = User.objects.create(username='bench-archive-client')
+        providers = []
+        for i in range(5):
+            user = User.objects.create(username=f'bench-archive-provider-{i}')
+            providers.append(Provider.objects.create(user=user, service=service, location='Tunis', cin=f'bench-archive-{i}'))
+
+        rng = random.Random(42)
+        old = timezone.now() - timedelta(days=365)
+        batch = 10_000
+        for start in range(0, options['orders'], batch):
+            orders = Order.objects.bulk_create(
+                Order(
+                    client=client_user,
+                    service=service,
+                    title='Benchmark order',
+                    description='Benchmark order description',
+                    location='Tunis',
+                    proposed_price_range_min=Decimal('10'),
+                    proposed_price_range_max=Decimal('100'),
+                    final_price=Decimal('10'),
+                    state=rng.choice(('completed', 'rejected')) if rng.random() < options['terminal_ratio'] else 'pending',
+                )
+                for _ in range(min(batch, options['orders'] - start))
+            )
+            offer.objects.bulk_create(
+                offer(provider=rng.choice(providers[1:]), Order=o, proposed_price=Decimal('50'))
+                for o in orders if rng.random() < options['offer_ratio']
+            )
+        # Terminal orders last changed a year ago, and were created before the pending ones
+        Order.objects.filter(service=service).exclude(state='pending').update(updated_at=old, created_at=old)
+        return service, client_user, providers[0]
@@ -0,0 +1,46 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from service.models import Service
+
+
+class Command(BaseCommand):
+    help = "Benchmark create_orders_batch against N sequential create_order calls."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=50)
+
+    def handle(self, *args, **options):
+        service = Service.objects.create(name='bench-batch', description='benchmark')
+        client_user = User.objects.create(username='bench-batch-client')
+        try:
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(client_user)
+            item = {
+                'service_id': service.id,
+                'title': 'Benchmark order',
+                'description': 'Benchmark order description',
+                'location': 'Tunis centre',
+                'proposed_price_range_min': '10.00',
+                'proposed_price_range_max': '100.00',
+            }
+            count = options['orders']
+
+            start = time.perf_counter()
+            for _ in range(count):
+                client.post('/service/create_order/', item, format='json')
+            sequential = time.perf_counter() - start
+
+            start = time.perf_counter()
+            response = client.post('/service/create_orders_batch/', {'orders': [item] * count}, format='json')
+            batch = time.perf_counter() - start
+
+            self.stdout.write(f"sequential create_order x{count}: {sequential * 1000:.1f} ms")
+            self.stdout.write(f"create_orders_batch ({response.status_code}): {batch * 1000:.1f} ms")
+            self.stdout.write(f"speedup: {sequential / batch:.1f}x")
+        finally:
+            service.delete()
+            client_user.delete()
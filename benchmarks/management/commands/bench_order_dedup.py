@@ -0,0 +1,111 @@
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from service import dedup
+from service.models import Order, OrderBand, Service
+
+WORDS = (
+    "fuite evier cuisine salle bain robinet chauffe eau peinture mur salon plafond porte fenetre serrure "
+    "climatiseur installation entretien reparation urgent rapide demain matin soir carrelage jardin haie "
+    "tonte electricite prise tableau disjoncteur lampe meuble montage demenagement cartons nettoyage vitres"
+).split()
+LOCATIONS = ('La Marsa, Tunis', 'Ariana', 'Sousse', 'Sfax', 'Bizerte', 'Nabeul', 'Le Bardo', 'Monastir')
+
+
+def _text(rng, words=14):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _edit(rng, text, changes):
+    words = text.split()
+    for i in rng.sample(range(len(words)), changes):
+        words[i] = rng.choice(WORDS)
+    return ' '.join(words)
+
+
+class Command(BaseCommand):
+    help = "Benchmark near-duplicate detection (MinHash/LSH band index) insert and query latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1_000_000)
+        parser.add_argument('--clients', type=int, default=50_000)
+        parser.add_argument('--queries', type=int, default=500)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        service = Service.objects.create(name='bench-dedup', description='benchmark')
+        try:
+            self.stdout.write(f"Seeding and indexing {options['orders']} orders...")
+            start = time.perf_counter()
+            clients = self.seed(service, rng, options)
+            self.stdout.write(
+                f"{OrderBand.objects.filter(order__service=service).count()} band rows in {time.perf_counter() - start:.1f} s"
+            )
+
+            samples = list(
+                Order.objects.filter(service=service).order_by('?')
+                .values_list('client_id', 'title', 'description', 'location')[:options['queries']]
+            )
+            for label, changes in (('near duplicate (1 word changed)', 1), ('new text', None)):
+                timings, found = [], 0
+                for client_id, title, description, location in samples:
+                    text = _text(rng) if changes is None else _edit(rng, description, changes)
+                    begin = time.perf_counter()
+                    duplicate = dedup.find_duplicate(client_id, service.id, dedup.Fingerprint(title, text, location))
+                    timings.append(time.perf_counter() - begin)
+                    found += duplicate is not None
+                self.report(f"query, {label}", timings, f"{found}/{len(samples)} flagged")
+
+            timings = []
+            with transaction.atomic():
+                for client_id in rng.sample(clients, min(options['queries'], len(clients))):
+                    order = Order.objects.create(
+                        client_id=client_id, service=service, title='Bench', description=_text(rng),
+                        location=rng.choice(LOCATIONS), proposed_price_range_min=Decimal('10'),
+                        proposed_price_range_max=Decimal('100'), final_price=Decimal('10'),
+                    )
+                    begin = time.perf_counter()
+                    fingerprint = dedup.Fingerprint(order.title, order.description, order.location)
+                    dedup.find_duplicate(client_id, service.id, fingerprint)
+                    dedup.index_orders([order], [fingerprint])
+                    timings.append(time.perf_counter() - begin)
+                transaction.set_rollback(True)
+            self.report("insert (fingerprint + lookup + index)", timings)
+
+            client_id = samples[0][0]
+            plan = OrderBand.objects.filter(client_id=client_id, key__in=dedup.Fingerprint('a', 'b', 'c').keys)
+            self.stdout.write(plan.explain() if connection.vendor != 'postgresql' else plan.explain(analyze=True))
+        finally:
+            OrderBand.objects.filter(order__service=service).delete()
+            service.delete()
+            User.objects.filter(username__startswith='bench-dedup-').delete()
+
+    def report(self, label, timings, extra=''):
+        timings.sort()
+        self.stdout.write(
+            f"{label}: median {timings[len(timings) // 2] * 1000:.2f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95) - 1] * 1000:.2f} ms {extra}"
+        )
+
+    def seed(self, service, rng, options):
+        users = User.objects.bulk_create(User(username=f'bench-dedup-{i}') for i in range(options['clients']))
+        clients = [user.id for user in users]
+        batch = 10_000
+        for begin in range(0, options['orders'], batch):
+            with transaction.atomic():
+                orders = Order.objects.bulk_create(
+                    Order(
+                        client_id=rng.choice(clients), service=service, title=' '.join(rng.sample(WORDS, 3)),
+                        description=_text(rng), location=rng.choice(LOCATIONS),
+                        proposed_price_range_min=Decimal('10'), proposed_price_range_max=Decimal('100'),
+                        final_price=Decimal('10'),
+                    )
+                    for _ in range(min(batch, options['orders'] - begin))
+                )
+                dedup.index_orders(orders)
+        return clients
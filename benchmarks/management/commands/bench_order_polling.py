@@ -0,0 +1,67 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from provider.models import Provider
+from service.models import Order, Service, offer
+
+
+class Command(BaseCommand):
+    help = "Benchmark bandwidth and CPU of polling list_orders with and without If-None-Match."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=50)
+        parser.add_argument('--offers-per-order', type=int, default=5)
+        parser.add_argument('--polls', type=int, default=200)
+
+    def handle(self, *args, **options):
+        service = Service.objects.create(name='bench-polling', description='benchmark')
+        client_user = User.objects.create(username='bench-poll-client')
+        try:
+            self.seed(service, client_user, options)
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(client_user)
+            url = '/service/list_orders/'
+
+            for label, conditional in (('unconditional', False), ('If-None-Match', True)):
+                etag = client.get(url)['ETag']
+                headers = {'HTTP_IF_NONE_MATCH': etag} if conditional else {}
+                sent = 0
+                cpu, wall = time.process_time(), time.perf_counter()
+                for _ in range(options['polls']):
+                    response = client.get(url, **headers)
+                    sent += len(response.content)
+                cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+                self.stdout.write(
+                    f"{label:>14}: status {response.status_code}, {sent / options['polls']:.0f} B/poll, "
+                    f"{cpu / options['polls'] * 1000:.2f} ms CPU/poll, {wall / options['polls'] * 1000:.2f} ms wall/poll"
+                )
+        finally:
+            service.delete()
+            User.objects.filter(username__startswith='bench-poll').delete()
+
+    def seed(self, service, client_user, options):
+        providers = []
+        for i in range(options['offers_per_order']):
+            user = User.objects.create(username=f'bench-poll-provider-{i}')
+            providers.append(Provider.objects.create(user=user, service=service, location='Tunis', cin=f'bench-poll-{i}'))
+        orders = Order.objects.bulk_create(
+            Order(
+                client=client_user,
+                service=service,
+                title='Benchmark order',
+                description='Benchmark order description',
+                location='Tunis',
+                proposed_price_range_min=Decimal('10'),
+                proposed_price_range_max=Decimal('100'),
+                final_price=Decimal('10'),
+            )
+            for _ in range(options['orders'])
+        )
+        offer.objects.bulk_create(
+            offer(provider=provider, Order=order, proposed_price=Decimal('50'), description='Benchmark offer')
+            for order in orders for provider in providers
+        )
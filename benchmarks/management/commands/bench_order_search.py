@@ -0,0 +1,73 @@
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from service.models import Order, Service
+from service.search import search_orders
+
+WORDS = (
+    'plomberie fuite robinet chauffe-eau climatisation installation réparation peinture '
+    'mur carrelage salle bain cuisine électricité prise tableau jardin taille haie '
+    'déménagement meubles montage nettoyage vitres bureau appartement villa urgent '
+    'serrure porte fenêtre toiture étanchéité maçonnerie parquet ponçage'
+).split()
+CITIES = ('Tunis', 'Sfax', 'Sousse', 'Ariana', 'Bizerte', 'Nabeul', 'Monastir', 'Gabès', 'Kairouan')
+
+
+class Command(BaseCommand):
+    help = "Seed synthetic orders and report full-text search latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1_000_000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--keep', action='store_true', help="Keep the generated rows.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(7)
+        service = Service.objects.create(name='bench-search', description='benchmark')
+        client = User.objects.create(username='bench-search-client')
+        try:
+            start = time.perf_counter()
+            self.seed(rng, service, client, options['orders'])
+            self.stdout.write(f"seeded {options['orders']} orders in {time.perf_counter() - start:.1f} s")
+
+            for label, filters in (('all services', {}), ('service + state', {'service_id': service.id, 'state': 'pending'})):
+                timings = []
+                for _ in range(options['queries']):
+                    text = ' '.join(rng.sample(WORDS, rng.randint(1, 3)))
+                    start = time.perf_counter()
+                    search_orders(text, limit=20, **filters)
+                    timings.append(time.perf_counter() - start)
+                timings.sort()
+                self.stdout.write(
+                    f"{label}: p50 {timings[len(timings) // 2] * 1000:.2f} ms, "
+                    f"p95 {timings[int(len(timings) * 0.95) - 1] * 1000:.2f} ms, "
+                    f"p99 {timings[int(len(timings) * 0.99) - 1] * 1000:.2f} ms"
+                )
+        finally:
+            if not options['keep']:
+                service.delete()
+                client.delete()
+
+    @transaction.atomic
+    def seed(self, rng, service, client, count):
+        batch = 10_000
+        for offset in range(0, count, batch):
+            Order.objects.bulk_create(
+                Order(
+                    client=client,
+                    service=service,
+                    title=' '.join(rng.sample(WORDS, 3)).capitalize(),
+                    description=' '.join(rng.choices(WORDS, k=20)),
+                    location=f'{rng.choice(CITIES)} centre',
+                    proposed_price_range_min=Decimal('10'),
+                    proposed_price_range_max=Decimal('100'),
+                    final_price=Decimal('10'),
+                    state=rng.choice(('pending', 'accepted', 'completed', 'rejected')),
+                )
+                for _ in range(min(batch, count - offset))
+            )
@@ -0,0 +1,71 @@
+import json
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from provider.models import Provider
+from service.models import Order, Service, offer
+from service.serializers import OrderListSerializer, OrderSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare payload size and serialization time of OrderSerializer (nested offers) and OrderListSerializer."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=50)
+        parser.add_argument('--offers-per-order', type=int, default=10)
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        service = Service.objects.create(name='bench-serializers', description='benchmark')
+        client_user = User.objects.create(username='bench-ser-client')
+        try:
+            ids = self.seed(service, client_user, options)
+            for label, serializer_class, queryset in (
+                ('OrderSerializer (nested offers)', OrderSerializer, Order.objects.for_listing()),
+                ('OrderListSerializer (aggregates)', OrderListSerializer, Order.objects.for_summary()),
+            ):
+                size, timings = 0, []
+                for _ in range(options['runs']):
+                    start = time.perf_counter()
+                    content = JSONRenderer().render(serializer_class(queryset.filter(id__in=ids), many=True).data)
+                    timings.append(time.perf_counter() - start)
+                    size = len(content)
+                timings.sort()
+                self.stdout.write(
+                    f"{label:>34}: {size} B ({size / len(ids):.0f} B/order), "
+                    f"median {timings[len(timings) // 2] * 1000:.2f} ms (queries + serialization + rendering)"
+                )
+            sample = OrderListSerializer(Order.objects.for_summary().get(id=ids[0])).data
+            self.stdout.write(json.dumps({key: sample[key] for key in ('offer_count', 'min_offer_price', 'max_offer_price')}))
+        finally:
+            service.delete()
+            User.objects.filter(username__startswith='bench-ser-').delete()
+
+    def seed(self, service, client_user, options):
+        providers = []
+        for i in range(options['offers_per_order']):
+            user = User.objects.create(username=f'bench-ser-provider-{i}')
+            providers.append(Provider.objects.create(user=user, service=service, location='Tunis', cin=f'bench-ser-{i}'))
+        orders = Order.objects.bulk_create(
+            Order(
+                client=client_user,
+                service=service,
+                title='Benchmark order',
+                description='Benchmark order description',
+                location='Tunis',
+                proposed_price_range_min=Decimal('10'),
+                proposed_price_range_max=Decimal('100'),
+                final_price=Decimal('10'),
+            )
+            for _ in range(options['orders'])
+        )
+        for order in orders:
+            for i, provider in enumerate(providers):
+                order.record_offer(offer.objects.create(
+                    provider=provider, Order=order, proposed_price=Decimal(20 + i * 5), description='Benchmark offer',
+                ))
+        return [order.id for order in orders]
@@ -0,0 +1,98 @@
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import OuterRef, Q, Subquery
+
+from provider.models import Provider
+from service.models import Order, Service, offer
+
+
+class Command(BaseCommand):
+    help = "Benchmark the provider available-orders feed query (legacy NOT IN vs NOT EXISTS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1_000_000)
+        parser.add_argument('--services', type=int, default=20)
+        parser.add_argument('--offer-ratio', type=float, default=0.3)
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--keep', action='store_true', help="Keep the generated rows.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Seeding {options['orders']} orders...")
+        client, services, providers = self.seed(options)
+        provider = providers[0]
+        page_size = options['page_size']
+
+        # Same rows as available_for(), only the anti-join differs
+        legacy = Order.objects.filter(
+            Q(service=provider.service_id, state='pending') & (Q(Confirmed_provider=None) | Q(Confirmed_provider=provider))
+        ).exclude(
+            id__in=Subquery(offer.objects.filter(provider=provider, Order=OuterRef('id')).values('Order'))
+        ).order_by('-created_at', '-id')
+        current = Order.objects.available_for(provider).order_by('-created_at', '-id')
+
+        try:
+            first_page = [list(q.values_list('id', flat=True)[:page_size]) for q in (legacy, current)]
+            if first_page[0] != first_page[1]:
+                self.stdout.write(self.style.ERROR("The two queries return different rows."))
+            for label, queryset in (('before (NOT IN subquery)', legacy), ('after (NOT EXISTS)', current)):
+                self.stdout.write(self.style.MIGRATE_HEADING(label))
+                self.stdout.write(self.explain(queryset[:page_size]))
+                timings = []
+                for _ in range(options['runs']):
+                    start = time.perf_counter()
+                    list(queryset.values_list('id', flat=True)[:page_size])
+                    timings.append(time.perf_counter() - start)
+                timings.sort()
+                self.stdout.write(
+                    f"median {timings[len(timings) // 2] * 1000:.2f} ms, "
+                    f"p95 {timings[int(len(timings) * 0.95) - 1] * 1000:.2f} ms"
+                )
+        finally:
+            if not options['keep']:
+                Service.objects.filter(id__in=[s.id for s in services]).delete()
+                User.objects.filter(username__startswith='bench-').delete()
+
+    def explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            return queryset.explain(analyze=True, buffers=True)
+        return queryset.explain()
+
+    @transaction.atomic
+    def seed(self, options):
+        client = User.objects.create(username='bench-client')
+        services = Service.objects.bulk_create(
+            Service(name=f'bench-{i}', description='benchmark') for i in range(options['services'])
+        )
+        providers = []
+        for i, service in enumerate(services):
+            user = User.objects.create(username=f'bench-provider-{i}')
+            providers.append(Provider.objects.create(user=user, service=service, location='Tunis', cin=f'bench-{i}'))
+
+        rng = random.Random(42)
+        batch = 10_000
+        for start in range(0, options['orders'], batch):
+            orders = Order.objects.bulk_create(
+                Order(
+                    client=client,
+                    service=rng.choice(services),
+                    title='Benchmark order',
+                    description='Benchmark order description',
+                    location='Tunis',
+                    proposed_price_range_min=Decimal('10'),
+                    proposed_price_range_max=Decimal('100'),
+                    final_price=Decimal('10'),
+                    state=rng.choice(('pending', 'pending', 'pending', 'accepted', 'completed')),
+                )
+                for _ in range(min(batch, options['orders'] - start))
+            )
+            offer.objects.bulk_create(
+                offer(provider=providers[services.index(o.service)], Order=o, proposed_price=Decimal('50'))
+                for o in orders if rng.random() < options['offer_ratio']
+            )
+        return client, services, providers
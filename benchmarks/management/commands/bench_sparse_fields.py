@@ -0,0 +1,77 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from service.models import Order, Service
+from service.serializers import OrderListSerializer
+from serviceLink.projection import SparseFieldset
+
+
+class Command(BaseCommand):
+    help = "Benchmark ?fields= projections against the regular list serializer."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=10_000)
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument(
+            '--fields', default='id,title,state,location,proposed_price_range_min,proposed_price_range_max,offer_count,created_at',
+        )
+
+    def handle(self, *args, **options):
+        service = Service.objects.create(name='bench-sparse', description='benchmark')
+        client_user = User.objects.create(username='bench-sparse-client')
+        try:
+            self.seed(service, client_user, options['orders'])
+            orders = Order.objects.filter(service=service)
+            names = options['fields'].split(',')
+            plain = [name for name, path in SparseFieldset(OrderListSerializer).columns.items() if path is not None]
+
+            def serializer(queryset, fields=None):
+                def run():
+                    data = OrderListSerializer(queryset, many=True).data
+                    if fields is not None:
+                        data = [{name: item[name] for name in fields} for item in data]
+                    return data
+                return run
+
+            def projection(fields):
+                fieldset = SparseFieldset(OrderListSerializer, fields)
+                return lambda: fieldset.serialize(list(fieldset.apply(orders)))
+
+            for label, function in (
+                ('OrderListSerializer, all fields', serializer(orders.for_summary())),
+                ('OrderListSerializer, then trimmed to ?fields=', serializer(orders.for_summary(), names)),
+                ('?fields= projection (.values())', projection(names)),
+                ('?expand= (all plain fields) projection', projection(plain)),
+            ):
+                timings, size = [], 0
+                for _ in range(options['runs']):
+                    start = time.perf_counter()
+                    size = len(JSONRenderer().render(function()))
+                    timings.append(time.perf_counter() - start)
+                timings.sort()
+                self.stdout.write(
+                    f"{label:>46}: median {timings[len(timings) // 2] * 1000:8.1f} ms, {size / 1024:8.0f} KiB"
+                )
+        finally:
+            service.delete()
+            User.objects.filter(username__startswith='bench-sparse-').delete()
+
+    def seed(self, service, client_user, count):
+        for start in range(0, count, 5_000):
+            Order.objects.bulk_create(
+                Order(
+                    client=client_user,
+                    service=service,
+                    title=f'Benchmark order {start + i}',
+                    description='Benchmark order description',
+                    location='Tunis',
+                    proposed_price_range_min=Decimal('10'),
+                    proposed_price_range_max=Decimal('100'),
+                    final_price=Decimal('10'),
+                )
+                for i in range(min(5_000, count - start))
+            )
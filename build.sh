@@ -7,6 +7,9 @@ pip install -r requirements.txt
 python3 manage.py makemigrations
 python3 manage.py migrate
 
+# rebuild denormalized tables
+python3 manage.py rebuild_provider_feed
+
 # collectstatic
 python3 manage.py collectstatic
 
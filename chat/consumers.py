@@ -1,5 +1,6 @@
 import json
 import logging
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from asgiref.sync import sync_to_async
 
@@ -224,4 +225,64 @@ class ChatConsumer(AsyncWebsocketConsumer):
             if key == b'authorization':           
                 return value.decode('utf-8').split()[1]
             
-        return None
\ No newline at end of file
+        return None
+
+class OrderFeedConsumer(AsyncWebsocketConsumer):
+    """Pushes new and removed orders of the provider's service (see service.realtime)."""
+
+    async def connect(self):
+        token = self.get_token(self.scope)
+        self.user = await self.authenticate_user(token) if token else None
+        self.provider = await self.get_approved_provider(self.user) if self.user else None
+        if not self.provider:
+            logger.error("Order feed connection refused: not an approved provider.")
+            await self.close()
+            return
+
+        from service.realtime import provider_group, service_group  # Deferred import
+        self.groups_joined = [service_group(self.provider.service_id), provider_group(self.provider.id)]
+        for group in self.groups_joined:
+            await self.channel_layer.group_add(group, self.channel_name)
+
+        await self.accept()
+        logger.info(f"Provider {self.provider.id} subscribed to the order feed of service {self.provider.service_id}.")
+
+    async def disconnect(self, close_code):
+        for group in getattr(self, 'groups_joined', []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        # Lecture seule : les actions passent par l'API REST
+        pass
+
+    async def order_added(self, event):
+        await self.send(text_data=json.dumps({'type': 'order.added', 'order': event['order']}))
+
+    async def order_removed(self, event):
+        await self.send(text_data=json.dumps({'type': 'order.removed', 'order_id': event['order_id']}))
+
+    @sync_to_async
+    def authenticate_user(self, token):
+        """Authenticate user using the JWT token."""
+        from rest_framework_simplejwt.tokens import AccessToken
+        from django.contrib.auth.models import User
+        try:
+            return User.objects.get(id=AccessToken(token)['user_id'])
+        except Exception as e:
+            logger.error(f"Authentication failed: {e}")
+            return None
+
+    @sync_to_async
+    def get_approved_provider(self, user):
+        """The user's provider profile if it is approved, else None."""
+        from provider.models import Provider  # Deferred import
+        return Provider.objects.filter(user=user, is_approved=True).first()
+
+    def get_token(self, scope):
+        """JWT from the Authorization header, or ?token= for browser clients."""
+        for key, value in scope['headers']:
+            if key == b'authorization':
+                parts = value.decode('utf-8').split()
+                return parts[1] if len(parts) == 2 else None
+        query = parse_qs(scope.get('query_string', b'').decode())
+        return query.get('token', [None])[0]
@@ -14,5 +14,10 @@ class Message(models.Model):
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['chat_room', 'timestamp', 'id'], name='message_room_timestamp_idx'),
+        ]
+
     def __str__(self):
         return f'{self.sender.username}: {self.content[:20]}'
\ No newline at end of file
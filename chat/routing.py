@@ -4,4 +4,5 @@ from . import consumers
 websocket_urlpatterns = [
     re_path(r'ws/chat/(?P<room_name>\w+)/(?P<room_user>\w+)/$', consumers.ChatConsumer.as_asgi()),
     re_path(r'ws/chat/(?P<room_name>\w+)/$', consumers.ChatConsumer.as_asgi()),
+    re_path(r'ws/orders/$', consumers.OrderFeedConsumer.as_asgi()),
 ]
\ No newline at end of file
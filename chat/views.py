@@ -3,11 +3,16 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from .models import ChatRoom, Message
 from .serializers import ChatRoomSerializer, MessageSerializer
+from serviceLink.pagination import KeysetPagination
+from serviceLink.projection import SparseFieldset
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_chat_rooms(request):
     chat_rooms = ChatRoom.objects.filter(participants=request.user)
+    fieldset = SparseFieldset.from_request(request, ChatRoomSerializer)  # 400 sur un champ inconnu
+    if fieldset:
+        return Response(fieldset.serialize(list(fieldset.apply(chat_rooms))))
     serializer = ChatRoomSerializer(chat_rooms, many=True)
     return Response(serializer.data)
 
@@ -26,6 +31,12 @@ def get_messages(request, room_id):
     chat_rooms = ChatRoom.objects.filter(participants=request.user)
     if not chat_rooms.filter(id=room_id).exists():
         return Response({"error": "Room not found."}, status=404)
-    messages = Message.objects.filter(chat_room_id=room_id).order_by('timestamp')
-    serializer = MessageSerializer(messages, many=True)
-    return Response(serializer.data)
+    messages = Message.objects.filter(chat_room_id=room_id)
+    fieldset = SparseFieldset.from_request(request, MessageSerializer)  # 400 sur un champ inconnu
+    paginator = KeysetPagination(ordering=('timestamp', 'id'))
+    if fieldset:
+        page = paginator.paginate_queryset(fieldset.apply(messages, keys=paginator.keys), request)
+        return paginator.get_paginated_response(fieldset.serialize(page))
+    page = paginator.paginate_queryset(messages, request)
+    serializer = MessageSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:39
+
+from django.db import migrations, models
+
+from serviceLink.geo import backfill
+
+
+def locate_providers(apps, schema_editor):
+    backfill(apps.get_model('provider', 'Provider').objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('provider', '0002_provider_cin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='provider',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='provider',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='provider',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(locate_providers, migrations.RunPython.noop),
+    ]
@@ -1,17 +1,27 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from serviceLink.geo import locate
+
 class Provider(models.Model):
     
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="provider")
     cin = models.CharField(max_length=20, unique=True, null=True)
     service = models.ForeignKey('service.Service', on_delete=models.CASCADE)
     location = models.CharField(max_length=150)
+    # Resolved from `location` by the offline gazetteer on save (serviceLink.geo)
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False, db_index=True)
     proof_document = models.FileField(upload_to="proofs/")
     is_approved = models.BooleanField(default=False)  # Validation par l'admin
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        locate(self)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.user.username} - {self.service} "
 
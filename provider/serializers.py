@@ -1,7 +1,10 @@
 from rest_framework import serializers
 from .models import Provider
+from service.serializers import CachedServiceField
 
 class ProviderSerializer(serializers.ModelSerializer):
+    service = CachedServiceField()
+
     class Meta:
         model = Provider
         fields = ['id','service','cin', 'location', 'proof_document', 'is_approved']
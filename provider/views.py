@@ -3,6 +3,8 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.db import transaction
+from service import feed
 from .serializers import ProviderSerializer
 from .models import Provider
 
@@ -15,7 +17,9 @@ def create_provider_request(request):
     """
     serializer = ProviderSerializer(data=request.data)
     if serializer.is_valid():
-        serializer.save(user=request.user)
+        with transaction.atomic():
+            provider = serializer.save(user=request.user)
+            feed.sync_provider(provider)
         return Response({"message": "Request submitted successfully."}, status=status.HTTP_201_CREATED)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
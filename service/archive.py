@@ -0,0 +1,74 @@
+"""
+Archival of terminal orders.
+
+Completed and rejected orders left untouched for ARCHIVE_RETENTION_DAYS are
+moved, with their offers and media rows, from the hot tables to ArchivedOrder,
+ArchivedOffer and ArchivedOrderMedia. Each batch is one transaction: rows are
+copied with their ids, then the hot rows are deleted.
+
+Media files do not move. Each archived media row takes its own reference on
+the MediaBlob before the hot row's deletion releases the old one.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ArchivedOffer, ArchivedOrder, ArchivedOrderMedia, MediaBlob, Order, OrderMedia, offer
+
+TERMINAL_STATES = ('completed', 'rejected')
+
+
+def _attnames(model):
+    return [field.attname for field in model._meta.concrete_fields if field.name != 'archived_at']
+
+
+def archivable(retention_days=None):
+    """Terminal orders whose last change is older than the retention period."""
+    if retention_days is None:
+        retention_days = settings.ARCHIVE_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    return Order.objects.filter(state__in=TERMINAL_STATES, updated_at__lt=cutoff)
+
+
+def archive_batch(order_ids):
+    """Move the given orders to the archive tables. Returns (orders, offers, media) counts."""
+    with transaction.atomic():
+        # Re-checked under lock: an order may have changed since it was selected
+        orders = list(
+            Order.objects.select_for_update()
+            .filter(id__in=order_ids, state__in=TERMINAL_STATES)
+            .values(*_attnames(ArchivedOrder))
+        )
+        ids = [row['id'] for row in orders]
+        offers = list(offer.objects.filter(Order__in=ids).values(*_attnames(ArchivedOffer)))
+        media = list(OrderMedia.objects.filter(order__in=ids).values(*_attnames(ArchivedOrderMedia)))
+
+        ArchivedOrder.objects.bulk_create(ArchivedOrder(**row) for row in orders)
+        ArchivedOffer.objects.bulk_create(ArchivedOffer(**row) for row in offers)
+        ArchivedOrderMedia.objects.bulk_create(ArchivedOrderMedia(**row) for row in media)
+
+        references = Counter(row['file'] for row in media if row['file'])
+        for count in set(references.values()):
+            names = [name for name, n in references.items() if n == count]
+            MediaBlob.objects.filter(name__in=names).update(refcount=F('refcount') + count)
+
+        Order.objects.filter(id__in=ids).delete()
+    return len(orders), len(offers), len(media)
+
+
+def archive_orders(retention_days=None, batch_size=None):
+    """Archive every eligible order, one batch per transaction. Yields each batch's counts."""
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    queryset = archivable(retention_days).order_by('id').values_list('id', flat=True)
+    last_id = 0
+    while True:
+        # Orders that changed state since selection are skipped, not retried forever
+        ids = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not ids:
+            return
+        last_id = ids[-1]
+        yield archive_batch(ids)
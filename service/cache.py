@@ -0,0 +1,167 @@
+"""
+Two-level cache for the Service catalog.
+
+Reads go through a per-process LRU (short TTL) and then the shared Django
+cache before touching the database. Shared keys embed a version number that
+is bumped by the Service post_save/post_delete signals, so invalidation is a
+single INCR; other processes drop their local copy within local_ttl.
+
+Misses are single-flight: one thread per process (a fixed pool of striped
+locks) and one process per key (a cache.add lock holding a random token)
+rebuild the value while the others wait for it.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Service
+
+_MISSING = object()
+LOCK_STRIPES = 64
+
+
+class TieredCache:
+    def __init__(self, namespace, local_ttl=30, shared_ttl=3600, max_entries=256, lock_timeout=10):
+        self.namespace = namespace
+        self.local_ttl = local_ttl
+        self.shared_ttl = shared_ttl
+        self.max_entries = max_entries
+        self.lock_timeout = lock_timeout
+        self._local = OrderedDict()
+        self._mutex = threading.Lock()
+        # Keys are client-supplied (service ids): a bounded pool, not one lock per key
+        self._key_locks = [threading.RLock() for _ in range(LOCK_STRIPES)]
+        self.stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    # Versioning
+
+    @property
+    def _version_key(self):
+        return f'{self.namespace}:version'
+
+    def version(self):
+        version = cache.get(self._version_key)
+        if version is None:
+            cache.add(self._version_key, 1, timeout=None)
+            version = cache.get(self._version_key, 1)
+        return version
+
+    def invalidate(self):
+        try:
+            cache.incr(self._version_key)
+        except ValueError:
+            cache.add(self._version_key, 2, timeout=None)
+        with self._mutex:
+            self._local.clear()
+
+    # Lookups
+
+    def get_or_set(self, key, loader):
+        value = self._get_local(key)
+        if value is not _MISSING:
+            self._count('local_hits')
+            return value
+
+        shared_key = f'{self.namespace}:{self.version()}:{key}'
+        value = cache.get(shared_key, _MISSING)
+        if value is not _MISSING:
+            self._count('shared_hits')
+            self._set_local(key, value)
+            return value
+
+        with self._key_lock(key):
+            # Another thread of this process may have filled it meanwhile
+            value = self._get_local(key)
+            if value is not _MISSING:
+                self._count('local_hits')
+                return value
+            value = self._load_shared(shared_key, loader)
+            self._set_local(key, value)
+            return value
+
+    def _load_shared(self, shared_key, loader):
+        lock_key = f'{shared_key}:lock'
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_timeout
+        while not cache.add(lock_key, token, timeout=self.lock_timeout):
+            # Someone else is rebuilding the key, wait for their result
+            time.sleep(0.05)
+            value = cache.get(shared_key, _MISSING)
+            if value is not _MISSING:
+                self._count('shared_hits')
+                return value
+            if time.monotonic() > deadline:
+                # Rebuild without the lock, which may now belong to another process
+                token = None
+                break
+        try:
+            self._count('misses')
+            value = loader()
+            cache.set(shared_key, value, timeout=self.shared_ttl)
+            return value
+        finally:
+            # Only release our own lock (it may have expired and been taken over)
+            if token is not None and cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    # Local tier
+
+    def _get_local(self, key):
+        with self._mutex:
+            entry = self._local.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return _MISSING
+            self._local.move_to_end(key)
+            return value
+
+    def _set_local(self, key, value):
+        with self._mutex:
+            self._local[key] = (time.monotonic() + self.local_ttl, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def _key_lock(self, key):
+        return self._key_locks[hash(key) % LOCK_STRIPES]
+
+    def _count(self, name):
+        with self._mutex:
+            self.stats[name] += 1
+
+    def get_stats(self):
+        with self._mutex:
+            return dict(self.stats, local_entries=len(self._local))
+
+
+service_cache = TieredCache(
+    'service',
+    local_ttl=getattr(settings, 'SERVICE_CACHE_LOCAL_TTL', 30),
+    shared_ttl=getattr(settings, 'SERVICE_CACHE_SHARED_TTL', 3600),
+)
+
+
+def get_service(service_id):
+    """Cached Service lookup by id, returns None when it does not exist."""
+    try:
+        service_id = int(service_id)
+    except (TypeError, ValueError):
+        return None
+    return service_cache.get_or_set(f'id:{service_id}', lambda: Service.objects.filter(id=service_id).first())
+
+
+def list_services():
+    """Cached serialized catalog, as returned by list_service."""
+    from .serializers import ServiceSerializer
+
+    return service_cache.get_or_set(
+        'list',
+        lambda: [dict(item) for item in ServiceSerializer(Service.objects.all(), many=True).data],
+    )
@@ -0,0 +1,117 @@
+"""
+Near-duplicate order detection with MinHash and LSH bands.
+
+The text of an order (title, description, location, normalized like the
+gazetteer does) is cut into character 5-grams. NUM_PERM MinHash values
+estimate the Jaccard similarity between two such sets; they are grouped in
+BANDS bands of ROWS values, and each band is hashed into an OrderBand key.
+Two orders share a key with probability 1 - (1 - J**ROWS)**BANDS: ~98.5% at
+J = 0.8, ~40% at J = 0.5, ~6% at J = 0.3.
+
+create_order and create_orders_batch look up the keys of each new order
+among the pending orders of the same client and service created within
+ORDER_DEDUP_WINDOW_DAYS (an index lookup per key, whatever the size of the
+table), then confirm candidates with the exact Jaccard similarity of their
+5-grams against ORDER_DEDUP_THRESHOLD. A duplicate is flagged through Order.duplicate_of
+(ORDER_DEDUP_ACTION = "flag", the default) or answered with the existing
+order ("merge"). `python manage.py rebuild_order_bands` backfills the index
+for pending orders and drops the keys of orders that left the window.
+"""
+import zlib
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from serviceLink.gazetteer import normalize
+from .models import Order, OrderBand
+
+SHINGLE_SIZE = 5
+BANDS = 8
+ROWS = 4
+NUM_PERM = BANDS * ROWS
+_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, int(_PRIME), NUM_PERM, dtype=np.uint64)[:, None]
+_B = _rng.integers(0, int(_PRIME), NUM_PERM, dtype=np.uint64)[:, None]
+
+
+def order_text(title, description, location):
+    return normalize(f"{title} {description} {location}").strip()
+
+
+def shingles(text):
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class Fingerprint:
+    """Shingles, MinHash signature and LSH band keys of an order text."""
+
+    def __init__(self, title, description, location):
+        self.shingles = shingles(order_text(title, description, location))
+        self.keys = self._band_keys() if self.shingles else []
+
+    @classmethod
+    def of(cls, order):
+        return cls(order.title, order.description, order.location)
+
+    def _band_keys(self):
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode()) for shingle in self.shingles), dtype=np.uint64, count=len(self.shingles)
+        ) % _PRIME
+        # (a * x + b) mod p stays below 2**62 with 31-bit operands
+        signature = ((_A * hashes + _B) % _PRIME).min(axis=1).astype(np.uint32)
+        return [(band << 32) | zlib.crc32(signature[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+
+def allows_duplicate(data):
+    """The client asked to create the order anyway (allow_duplicate=true)."""
+    return str(data.get('allow_duplicate', '')).lower() in ('1', 'true', 'yes')
+
+
+def check(client_id, service_id, fingerprint, allow_duplicate=False):
+    """find_duplicate, unless ORDER_DEDUP_ACTION is "off" or the client allowed a duplicate."""
+    if settings.ORDER_DEDUP_ACTION == 'off' or allow_duplicate:
+        return None
+    return find_duplicate(client_id, service_id, fingerprint)
+
+
+def find_duplicate(client_id, service_id, fingerprint):
+    """(order, similarity) of the most similar recent pending order of the client, or None."""
+    if not fingerprint.keys:
+        return None
+    since = timezone.now() - timedelta(days=settings.ORDER_DEDUP_WINDOW_DAYS)
+    # Resolved first: as a subquery, the planner may scan the service's orders instead
+    candidate_ids = set(
+        OrderBand.objects.filter(client_id=client_id, key__in=fingerprint.keys).values_list('order', flat=True)
+    )
+    if not candidate_ids:
+        return None
+    candidates = Order.objects.filter(
+        id__in=candidate_ids, service_id=service_id, state='pending', created_at__gte=since,
+    ).only('id', 'title', 'description', 'location')
+    best = None
+    for candidate in candidates:
+        similarity = jaccard(fingerprint.shingles, Fingerprint.of(candidate).shingles)
+        if similarity >= settings.ORDER_DEDUP_THRESHOLD and (best is None or similarity > best[1]):
+            best = (candidate, similarity)
+    return best
+
+
+def index_orders(orders, fingerprints=None):
+    """Add the band keys of new orders to the index."""
+    fingerprints = fingerprints or [Fingerprint.of(order) for order in orders]
+    OrderBand.objects.bulk_create(
+        OrderBand(order_id=order.id, client_id=order.client_id, key=key)
+        for order, fingerprint in zip(orders, fingerprints)
+        for key in fingerprint.keys
+    )
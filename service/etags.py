@@ -0,0 +1,49 @@
+"""
+Version tokens for conditional GETs on orders and offers.
+
+The token is derived from counts and max(updated_at) of the rows a response is
+built from, so it can be checked with a few aggregate queries before anything
+is loaded or serialized.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import OrderMedia, offer
+
+
+def orders_etag(request, orders, archived=None):
+    """ETag for a response built from `orders` (and their offers and media), plus `archived` orders if given."""
+    order_state = orders.aggregate(n=Count('id'), at=Max('updated_at'))
+    offer_state = offer.objects.filter(Order__in=orders.values('id')).aggregate(n=Count('id'), at=Max('updated_at'))
+    media_state = OrderMedia.objects.filter(order__in=orders.values('id')).aggregate(n=Count('id'), at=Max('uploaded_at'))
+    if archived is None:
+        return _make_etag(request, order_state, offer_state, media_state)
+    # Archived rows never change: only new arrivals matter
+    archived_state = archived.aggregate(n=Count('id'), at=Max('archived_at'))
+    return _make_etag(request, order_state, offer_state, media_state, archived_state)
+
+
+def offers_etag(request, offers):
+    """ETag for a response built from `offers`."""
+    return _make_etag(request, offers.aggregate(n=Count('id'), at=Max('updated_at')))
+
+
+def _make_etag(request, *states):
+    # The query string is part of the token: pages and page sizes differ
+    key = repr((request.get_full_path(), request.user.pk) + tuple(sorted(s.items()) for s in states))
+    return '"%s"' % hashlib.md5(key.encode()).hexdigest()
+
+
+def not_modified(request, etag):
+    """304 response when the client's If-None-Match matches `etag`, else None."""
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return None
+    etags = parse_etags(if_none_match)
+    if '*' in etags or etag in etags or etag in (e.removeprefix('W/') for e in etags):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return None
@@ -0,0 +1,200 @@
+"""
+Streaming exports of orders, offers and providers (admin endpoint and
+`python manage.py export_data`).
+
+Rows are read with .values_list().iterator(chunk_size), a server-side cursor on
+PostgreSQL, and written out one chunk at a time as NDJSON or CSV, optionally
+gzipped, so memory stays flat whatever the table size.
+
+Orders and offers moved out by service.archive are read from their archive
+tables as well, unless include_archived is off; both keep their ids, so the
+two streams are merged back in id order.
+"""
+import csv
+import heapq
+import io
+from datetime import datetime, time
+from operator import itemgetter
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import router
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from provider.models import Provider
+from serviceLink.compression import compress_stream
+from .models import ArchivedOffer, ArchivedOrder, Order, offer
+
+CHUNK_SIZE = 2000
+FORMATS = ('ndjson', 'csv')
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8', 'gzip': 'application/gzip'}
+
+# kind: (queryset, columns as (name, lookup), lookups of the service and state filters, archived queryset)
+EXPORTS = {
+    'orders': (
+        lambda: Order.objects.all(),
+        [
+            ('id', 'id'), ('client', 'client_id'), ('client_name', 'client__username'), ('service', 'service_id'),
+            ('Confirmed_provider', 'Confirmed_provider_id'), ('accepted_offer', 'accepted_offer_id'),
+            ('title', 'title'), ('description', 'description'), ('location', 'location'),
+            ('latitude', 'latitude'), ('longitude', 'longitude'),
+            ('proposed_price_range_min', 'proposed_price_range_min'), ('proposed_price_range_max', 'proposed_price_range_max'),
+            ('final_price', 'final_price'), ('currency', 'currency'), ('state', 'state'),
+            ('offer_count', 'offer_count'), ('min_offer_price', 'min_offer_price'), ('max_offer_price', 'max_offer_price'),
+            ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+        ],
+        ('service', 'state'),
+        lambda: ArchivedOrder.objects.all(),
+    ),
+    'offers': (
+        lambda: offer.objects.all(),
+        [
+            ('id', 'id'), ('Order', 'Order_id'), ('provider', 'provider_id'), ('provider_name', 'provider__user__username'),
+            ('proposed_price', 'proposed_price'), ('description', 'description'), ('accepted', 'accepted'),
+            ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+        ],
+        ('Order__service', 'Order__state'),
+        lambda: ArchivedOffer.objects.all(),
+    ),
+    'providers': (
+        lambda: Provider.objects.all(),
+        [
+            ('id', 'id'), ('user', 'user_id'), ('username', 'user__username'), ('email', 'user__email'),
+            ('service', 'service_id'), ('location', 'location'), ('latitude', 'latitude'), ('longitude', 'longitude'),
+            ('is_approved', 'is_approved'), ('created_at', 'created_at'),
+        ],
+        ('service', None),
+        None,
+    ),
+}
+
+
+def _parse_moment(value, name, end_of_day=False):
+    try:
+        # Date first: parse_datetime also accepts a bare date, as midnight
+        day = parse_date(value)
+        moment = parse_datetime(value) if day is None else None
+    except ValueError:
+        # Well formed but out of range, e.g. 2024-13-01
+        day = moment = None
+    if day is not None:
+        moment = datetime.combine(day, time.max if end_of_day else time.min)
+    elif moment is None:
+        raise ValidationError({name: "Expected an ISO date or datetime."})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def rows(kind, service=None, state=None, since=None, until=None, chunk_size=CHUNK_SIZE, include_archived=True):
+    """(column names, iterator of row tuples) for an export, filters given as strings."""
+    if kind not in EXPORTS:
+        raise ValidationError({"kind": f"Expected one of {', '.join(EXPORTS)}."})
+    queryset_factory, columns, (service_lookup, state_lookup), archived_factory = EXPORTS[kind]
+
+    filters = {}
+    if service:
+        try:
+            filters[service_lookup] = int(service)
+        except ValueError:
+            raise ValidationError({"service": "Expected a service id."})
+    if state:
+        if state_lookup is None:
+            raise ValidationError({"state": f"Not available for {kind}."})
+        if state not in dict(Order.STATES):
+            raise ValidationError({"state": f"Expected one of {', '.join(dict(Order.STATES))}."})
+        filters[state_lookup] = state
+    if since:
+        filters['created_at__gte'] = _parse_moment(since, 'since')
+    if until:
+        filters['created_at__lte'] = _parse_moment(until, 'until', end_of_day=True)
+
+    querysets = [queryset_factory()]
+    if include_archived and archived_factory is not None:
+        querysets.append(archived_factory())
+    names = [name for name, _ in columns]
+    iterators = []
+    for queryset in querysets:
+        # The database is picked now: the rows are read after the view has returned
+        queryset = queryset.filter(**filters).using(router.db_for_read(queryset.model))
+        values = queryset.order_by('id').values_list(*(lookup for _, lookup in columns))
+        iterators.append(values.iterator(chunk_size=chunk_size))
+    if len(iterators) == 1:
+        return names, iterators[0]
+    return names, heapq.merge(*iterators, key=itemgetter(0))
+
+
+def _batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _ndjson(names, records, chunk_size):
+    option = orjson.OPT_UTC_Z | orjson.OPT_APPEND_NEWLINE
+    for batch in _batched(records, chunk_size):
+        yield b''.join(orjson.dumps(dict(zip(names, record)), default=str, option=option) for record in batch)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _csv(names, records, chunk_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for batch in _batched(records, chunk_size):
+        writer.writerows([_csv_value(value) for value in record] for record in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header of an empty export
+        yield buffer.getvalue().encode()
+
+
+def stream(names, records, output='ndjson', gzip=False, chunk_size=CHUNK_SIZE):
+    """Byte chunks of the export, one per `chunk_size` rows."""
+    if output not in FORMATS:
+        raise ValidationError({"output": f"Expected one of {', '.join(FORMATS)}."})
+    chunks = (_ndjson if output == 'ndjson' else _csv)(names, records, chunk_size)
+    return compress_stream(chunks, 'gzip') if gzip else chunks
+
+
+def filename(kind, output, gzip=False):
+    name = f"{kind}-{timezone.now():%Y%m%d-%H%M%S}.{output}"
+    return name + '.gz' if gzip else name
+
+
+async def _aiter(chunks):
+    # Under ASGI a sync iterator would be drained into a list first; pull it
+    # chunk by chunk in the thread that owns the database connection instead
+    pull = sync_to_async(next, thread_sensitive=True)
+    while True:
+        chunk = await pull(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def streaming_response(request, kind, names, records, output='ndjson', gzip=False):
+    chunks = stream(names, records, output, gzip)
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        chunks = _aiter(chunks)
+    response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES['gzip' if gzip else output])
+    response['Content-Disposition'] = f'attachment; filename="{filename(kind, output, gzip)}"'
+    return response
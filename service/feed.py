@@ -0,0 +1,69 @@
+"""
+Incremental maintenance of the per-provider "available orders" feed.
+
+ProviderFeedEntry holds one row per (provider, order) pair that
+Order.objects.available_for(provider) would return, so the feed endpoint is a
+single range scan on (provider, created_at). Callers run these helpers inside
+the same transaction as the write that changed the order.
+"""
+from provider.models import Provider
+from .models import Order, ProviderFeedEntry, offer
+
+
+def _entry(order, **provider):
+    return ProviderFeedEntry(
+        order=order, created_at=order.created_at,
+        latitude=order.latitude, longitude=order.longitude, geohash=order.geohash,
+        **provider,
+    )
+
+
+def sync_order(order):
+    """Recompute the feed rows of a single order from its current state."""
+    ProviderFeedEntry.objects.filter(order=order).delete()
+    if order.state != 'pending':
+        return
+    providers = Provider.objects.filter(service=order.service_id).exclude(
+        id__in=offer.objects.filter(Order=order).values('provider')
+    )
+    if order.Confirmed_provider_id:
+        providers = providers.filter(id=order.Confirmed_provider_id)
+    ProviderFeedEntry.objects.bulk_create(
+        _entry(order, provider_id=provider_id)
+        for provider_id in providers.values_list('id', flat=True)
+    )
+
+
+def add_orders(orders):
+    """Bulk variant of sync_order for freshly created orders (no offers yet)."""
+    service_ids = {order.service_id for order in orders if order.state == 'pending'}
+    providers = {}
+    for provider_id, service_id in Provider.objects.filter(service__in=service_ids).values_list('id', 'service'):
+        providers.setdefault(service_id, []).append(provider_id)
+    ProviderFeedEntry.objects.bulk_create(
+        (
+            _entry(order, provider_id=provider_id)
+            for order in orders if order.state == 'pending'
+            for provider_id in providers.get(order.service_id, ())
+            if order.Confirmed_provider_id in (None, provider_id)
+        ),
+        batch_size=1000,
+    )
+
+
+def remove_for_provider(order, provider):
+    """The provider answered the order (offer or rejection)."""
+    ProviderFeedEntry.objects.filter(order=order, provider=provider).delete()
+
+
+def sync_provider(provider):
+    """Rebuild the feed of one provider, e.g. after it joined or changed service."""
+    ProviderFeedEntry.objects.filter(provider=provider).delete()
+    ProviderFeedEntry.objects.bulk_create(
+        (
+            _entry(order, provider=provider)
+            for order in Order.objects.available_for(provider)
+            .only('id', 'created_at', 'latitude', 'longitude', 'geohash').iterator()
+        ),
+        batch_size=1000,
+    )
@@ -0,0 +1,133 @@
+"""
+Idempotency-Key support for creation POSTs.
+
+A client that retries a POST with the same Idempotency-Key header gets the
+stored response of the first attempt back (status, body and the headers the
+view set, plus Idempotent-Replayed: true) instead of a second order, offer
+or acceptance. Keys are scoped to the user.
+
+The first request claims the key by inserting its row: the unique constraint
+on (user, key) makes a concurrent duplicate fail and answer 409 while the
+first one runs. The view and the storage of its response share a transaction,
+so a stored response always matches committed writes; a 5xx response or an
+exception rolls the view back and frees the key for a retry. Reusing a key
+with a different request is rejected with 422.
+
+Responses are kept IDEMPOTENCY_KEY_TTL seconds; a claim whose request never
+finished can be taken over after IDEMPOTENCY_LOCK_TIMEOUT seconds.
+`python manage.py sweep_idempotency_keys` deletes expired rows.
+"""
+import hashlib
+import zlib
+from datetime import timedelta
+from functools import wraps
+
+import orjson
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from serviceLink.renderers import ORJSONRenderer
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# Set again when the replayed response is rendered
+RENDERING_HEADERS = {'content-type', 'content-length', 'vary', 'allow'}
+
+
+def _canonical(value):
+    if isinstance(value, UploadedFile):
+        # Set by HashingFileUploadHandler while the file was received
+        return f"{value.name}:{getattr(value, 'sha256', None) or value.size}"
+    return value
+
+
+def fingerprint(request):
+    """Hash of the method, path and parsed body (files by content hash)."""
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = {key: [_canonical(value) for value in values] for key, values in data.lists()}
+    payload = orjson.dumps([request.method, request.path, data], option=orjson.OPT_SORT_KEYS, default=str)
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _claim(user, key, digest):
+    """(claimed row, None), or (None, existing row) when the key is already taken."""
+    existing = None
+    for _ in range(3):
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                claim = IdempotencyKey.objects.create(
+                    user=user, key=key, fingerprint=digest,
+                    expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT),
+                )
+            return claim, None
+        except IntegrityError:
+            existing = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if existing is not None and existing.expires_at > now:
+            return None, existing
+        if existing is not None:
+            # Expired response or abandoned claim: take the key over
+            IdempotencyKey.objects.filter(pk=existing.pk, expires_at=existing.expires_at).delete()
+    return None, existing
+
+
+def _replay(row):
+    data = orjson.loads(zlib.decompress(bytes(row.response))) if row.response else None
+    return Response(data, status=row.status_code, headers={**row.headers, 'Idempotent-Replayed': 'true'})
+
+
+def _store(claim, response):
+    body = ORJSONRenderer().render(response.data)
+    IdempotencyKey.objects.filter(pk=claim.pk).update(
+        status_code=response.status_code,
+        response=zlib.compress(body) if body else None,
+        headers={name: value for name, value in response.items() if name.lower() not in RENDERING_HEADERS},
+        expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+    )
+
+
+def idempotent(view):
+    """Honour the Idempotency-Key header on a function-based API view (below @api_view)."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({"error": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters."}, status=status.HTTP_400_BAD_REQUEST)
+
+        digest = fingerprint(request)
+        claim, existing = _claim(request.user, key, digest)
+        if claim is None:
+            if existing is None or existing.status_code is None:
+                return Response(
+                    {"error": f"A request with this {HEADER} is already in progress."},
+                    status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'},
+                )
+            if existing.fingerprint != digest:
+                return Response(
+                    {"error": f"This {HEADER} was already used for a different request."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            return _replay(existing)
+
+        stored = False
+        try:
+            with transaction.atomic():
+                response = view(request, *args, **kwargs)
+                if isinstance(response, Response) and response.status_code < 500:
+                    _store(claim, response)
+                    stored = True
+                elif response.status_code >= 500:
+                    transaction.set_rollback(True)
+            return response
+        finally:
+            if not stored:
+                claim.delete()
+    return wrapper
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from service.archive import archivable, archive_orders
+
+
+class Command(BaseCommand):
+    help = "Move completed and rejected orders past the retention period to the archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ARCHIVE_RETENTION_DAYS, help="Retention period in days.")
+        parser.add_argument('--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE, help="Orders per transaction.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the orders to archive.")
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.stdout.write(f"{archivable(options['days']).count()} order(s) to archive.")
+            return
+
+        totals = [0, 0, 0]
+        for counts in archive_orders(options['days'], options['batch_size']):
+            totals = [total + count for total, count in zip(totals, counts)]
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Batch: {counts[0]} orders, {counts[1]} offers, {counts[2]} media")
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {totals[0]} orders, {totals[1]} offers and {totals[2]} media."
+        ))
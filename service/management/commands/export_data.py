@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from service import export
+
+
+class Command(BaseCommand):
+    help = "Stream orders, offers or providers as NDJSON or CSV (optionally gzipped) to a file or stdout."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(export.EXPORTS))
+        parser.add_argument('--output', choices=export.FORMATS, default='ndjson')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--service', help="Service id.")
+        parser.add_argument('--state', help="Order state (orders and offers only).")
+        parser.add_argument('--since', help="ISO date or datetime, on created_at.")
+        parser.add_argument('--until', help="ISO date or datetime, on created_at (inclusive).")
+        parser.add_argument('--chunk-size', type=int, default=export.CHUNK_SIZE)
+        parser.add_argument('--file', help="Destination path, stdout by default.")
+        parser.add_argument(
+            '--no-archived', dest='include_archived', action='store_false',
+            help="Leave out archived orders and offers.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            names, records = export.rows(
+                options['kind'],
+                service=options['service'],
+                state=options['state'],
+                since=options['since'],
+                until=options['until'],
+                chunk_size=options['chunk_size'],
+                include_archived=options['include_archived'],
+            )
+        except ValidationError as e:
+            raise CommandError(e.detail)
+
+        chunks = export.stream(names, records, options['output'], options['gzip'], options['chunk_size'])
+        destination = open(options['file'], 'wb') if options['file'] else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                destination.write(chunk)
+        finally:
+            if options['file']:
+                destination.close()
+            else:
+                destination.flush()
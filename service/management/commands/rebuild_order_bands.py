@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from service import dedup
+from service.models import Order, OrderBand
+
+
+class Command(BaseCommand):
+    help = "Rebuild the near-duplicate LSH index for the pending orders of the dedup window, dropping stale keys."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=settings.ORDER_DEDUP_WINDOW_DAYS)
+        orders = Order.objects.filter(state='pending', created_at__gte=since)
+
+        stale = OrderBand.objects.exclude(order__in=orders.values('id')).delete()[0]
+        indexed = 0
+        queryset = orders.only('id', 'client', 'title', 'description', 'location').order_by('id')
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            with transaction.atomic():
+                OrderBand.objects.filter(order__in=batch).delete()
+                dedup.index_orders(batch)
+            indexed += len(batch)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} pending order(s), dropped {stale} stale key(s)."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from service import price_hints
+from service.models import Service
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-service price sketches from the accepted offers (hot and archived orders)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--service', type=int, help="Restrict to a single service id.")
+
+    def handle(self, *args, **options):
+        services = Service.objects.order_by('id').values_list('id', flat=True)
+        if options['service']:
+            services = services.filter(id=options['service'])
+        for service_id in services:
+            count = price_hints.rebuild(service_id)
+            self.stdout.write(f"service {service_id}: {count} accepted price(s)")
+        self.stdout.write(self.style.SUCCESS("Price sketches rebuilt."))
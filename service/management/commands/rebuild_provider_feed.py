@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from provider.models import Provider
+from service import feed
+from service.models import Order, ProviderFeedEntry
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized provider feed table, or check it against the source tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only report inconsistencies, do not write.")
+        parser.add_argument('--provider', type=int, help="Restrict to a single provider id.")
+
+    def handle(self, *args, **options):
+        providers = Provider.objects.all()
+        if options['provider']:
+            providers = providers.filter(id=options['provider'])
+
+        if not options['check']:
+            for provider in providers.iterator():
+                with transaction.atomic():
+                    feed.sync_provider(provider)
+            self.stdout.write(self.style.SUCCESS(f"Feed rebuilt ({ProviderFeedEntry.objects.count()} entries)."))
+            return
+
+        inconsistent = 0
+        for provider in providers.iterator():
+            expected = set(Order.objects.available_for(provider).values_list('id', flat=True))
+            stored = set(ProviderFeedEntry.objects.filter(provider=provider).values_list('order_id', flat=True))
+            missing, extra = expected - stored, stored - expected
+            if missing or extra:
+                inconsistent += 1
+                self.stdout.write(
+                    f"provider {provider.id}: {len(missing)} missing, {len(extra)} extra "
+                    f"(missing {sorted(missing)[:10]}, extra {sorted(extra)[:10]})"
+                )
+        if inconsistent:
+            raise CommandError(f"{inconsistent} provider feed(s) inconsistent, run without --check to rebuild.")
+        self.stdout.write(self.style.SUCCESS("Feed is consistent."))
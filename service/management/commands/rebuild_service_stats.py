@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from service import stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the (service, day) analytics rollups from orders and offers (archived ones included), yesterday and today by default."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="First day (YYYY-MM-DD).")
+        parser.add_argument('--until', help="Last day (YYYY-MM-DD), today by default.")
+
+    def handle(self, *args, **options):
+        days = {}
+        for name in ('since', 'until'):
+            if options[name]:
+                try:
+                    days[name] = parse_date(options[name])
+                except ValueError:
+                    days[name] = None
+                if days[name] is None:
+                    raise CommandError(f"--{name} expects a YYYY-MM-DD date.")
+        until = days.get('until') or timezone.localdate()
+        since = days.get('since') or until - timedelta(days=1)
+        if since > until:
+            raise CommandError("--since must not be after --until.")
+
+        # One day per transaction: long backfills do not hold locks for their whole duration
+        rows = 0
+        day = since
+        while day <= until:
+            rows += stats.rebuild(day, day)
+            day += timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} rollup row(s) from {since} to {until}."))
@@ -0,0 +1,29 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database into the SQLite replicas (stands in for replication in local setups)."
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("No replica configured, set DATABASE_REPLICA_URLS.")
+        databases = [settings.DATABASES[alias] for alias in ['default', *settings.DATABASE_REPLICAS]]
+        if any(database['ENGINE'] != 'django.db.backends.sqlite3' for database in databases):
+            raise CommandError("Only SQLite primary and replicas can be synchronized, real replicas use the server's replication.")
+
+        source = sqlite3.connect(databases[0]['NAME'])
+        try:
+            for alias in settings.DATABASE_REPLICAS:
+                connections[alias].close()
+                target = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(self.style.SUCCESS(f"{alias} synchronized."))
+        finally:
+            source.close()
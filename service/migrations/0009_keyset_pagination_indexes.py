@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('provider', '0002_provider_cin'),
+        ('service', '0008_order_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(fields=['Order', 'created_at', 'id'], name='offer_order_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['client', 'created_at', 'id'], name='order_client_created_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:27
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def remove_duplicate_offers(apps, schema_editor):
+    # Keep one offer per (provider, Order) before adding the unique constraint:
+    # the accepted one if any, otherwise the most recent.
+    Offer = apps.get_model('service', 'offer')
+    Order = apps.get_model('service', 'Order')
+    duplicates = (
+        Offer.objects.values('provider', 'Order')
+        .annotate(n=Count('id'), last_id=Max('id'))
+        .filter(n__gt=1)
+    )
+    for group in duplicates:
+        ids = list(Offer.objects.filter(provider=group['provider'], Order=group['Order']).values_list('id', flat=True))
+        accepted = Order.objects.filter(accepted_offer__in=ids).values_list('accepted_offer', flat=True).first()
+        keep = accepted or group['last_id']
+        stale = [i for i in ids if i != keep]
+        # accepted_offer cascades on delete, repoint it before removing the rows
+        Order.objects.filter(accepted_offer__in=stale).update(accepted_offer=keep)
+        Offer.objects.filter(id__in=stale).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('provider', '0002_provider_cin'),
+        ('service', '0009_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_offers, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['service', 'Confirmed_provider', 'created_at'], name='order_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('state', 'pending')), fields=['service', 'created_at'], name='order_pending_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='offer',
+            constraint=models.UniqueConstraint(fields=('provider', 'Order'), name='unique_offer_per_provider'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('provider', '0002_provider_cin'),
+        ('service', '0010_provider_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderFeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='service.order')),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='provider.provider')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['provider', 'created_at', 'order'], name='feed_provider_created_idx')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'order'), name='unique_feed_entry')],
+            },
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:36
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+POSTGRES_FORWARD = [
+    """
+    CREATE OR REPLACE FUNCTION service_order_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(NEW.location, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER service_order_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description, location ON service_order
+    FOR EACH ROW EXECUTE FUNCTION service_order_search_vector_update()
+    """,
+    """
+    UPDATE service_order SET search_vector =
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(location, '')), 'C')
+    """,
+    "CREATE INDEX order_search_vector_idx ON service_order USING gin (search_vector)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS order_search_vector_idx",
+    "DROP TRIGGER IF EXISTS service_order_search_vector_trigger ON service_order",
+    "DROP FUNCTION IF EXISTS service_order_search_vector_update()",
+]
+
+# External-content FTS5 table kept in sync with service_order by triggers
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE service_order_fts USING fts5(
+        title, description, location, content='service_order', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER service_order_fts_insert AFTER INSERT ON service_order BEGIN
+        INSERT INTO service_order_fts(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END
+    """,
+    """
+    CREATE TRIGGER service_order_fts_delete AFTER DELETE ON service_order BEGIN
+        INSERT INTO service_order_fts(service_order_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+    END
+    """,
+    """
+    CREATE TRIGGER service_order_fts_update AFTER UPDATE OF title, description, location ON service_order BEGIN
+        INSERT INTO service_order_fts(service_order_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+        INSERT INTO service_order_fts(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END
+    """,
+    "INSERT INTO service_order_fts(service_order_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS service_order_fts_update",
+    "DROP TRIGGER IF EXISTS service_order_fts_delete",
+    "DROP TRIGGER IF EXISTS service_order_fts_insert",
+    "DROP TABLE IF EXISTS service_order_fts",
+]
+
+
+def run_for_vendor(postgres, sqlite):
+    def run(apps, schema_editor):
+        statements = {'postgresql': postgres, 'sqlite': sqlite}.get(schema_editor.connection.vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0013_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            run_for_vendor(POSTGRES_FORWARD, SQLITE_FORWARD),
+            run_for_vendor(POSTGRES_BACKWARD, SQLITE_BACKWARD),
+        ),
+    ]
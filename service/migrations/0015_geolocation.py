@@ -0,0 +1,65 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:39
+
+from django.db import migrations, models
+
+from serviceLink.geo import backfill
+
+
+def locate_orders(apps, schema_editor):
+    backfill(apps.get_model('service', 'Order').objects.all())
+
+
+def copy_feed_locations(apps, schema_editor):
+    Order = apps.get_model('service', 'Order')
+    ProviderFeedEntry = apps.get_model('service', 'ProviderFeedEntry')
+    for order in Order.objects.exclude(geohash='').only('pk', 'latitude', 'longitude', 'geohash').iterator(chunk_size=1000):
+        ProviderFeedEntry.objects.filter(order_id=order.pk).update(
+            latitude=order.latitude, longitude=order.longitude, geohash=order.geohash,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('provider', '0003_geolocation'),
+        ('service', '0014_order_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='providerfeedentry',
+            name='geohash',
+            field=models.CharField(blank=True, default='', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='providerfeedentry',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='providerfeedentry',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='providerfeedentry',
+            index=models.Index(fields=['provider', 'geohash'], name='feed_provider_geohash_idx'),
+        ),
+        migrations.RunPython(locate_orders, migrations.RunPython.noop),
+        migrations.RunPython(copy_feed_locations, migrations.RunPython.noop),
+    ]
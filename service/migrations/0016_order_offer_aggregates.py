@@ -0,0 +1,52 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:44
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_offer_aggregates(apps, schema_editor):
+    Order = apps.get_model('service', 'Order')
+    offer = apps.get_model('service', 'offer')
+    bids = offer.objects.filter(Order=OuterRef('pk'), accepted=True).order_by().values('Order')
+
+    def aggregate(function, field):
+        return Subquery(bids.annotate(value=function(field)).values('value')[:1])
+
+    Order.objects.filter(id__in=offer.objects.filter(accepted=True).values('Order')).update(
+        offer_count=Coalesce(aggregate(Count, 'id'), 0),
+        min_offer_price=aggregate(Min, 'proposed_price'),
+        max_offer_price=aggregate(Max, 'proposed_price'),
+        last_offer_at=aggregate(Max, 'created_at'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0015_geolocation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='last_offer_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='max_offer_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='min_offer_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='offer_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_offer_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:55
+
+import django.db.models.deletion
+import service.storage
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('provider', '0003_geolocation'),
+        ('service', '0016_order_offer_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOffer',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('proposed_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('accepted', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='provider.provider')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=100)),
+                ('description', models.TextField()),
+                ('location', models.CharField(max_length=150)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('geohash', models.CharField(blank=True, default='', max_length=12)),
+                ('proposed_price_range_min', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('proposed_price_range_max', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('final_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('currency', models.CharField(default='TND', max_length=5)),
+                ('state', models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('completed', 'Completed'), ('rejected', 'Rejected')], max_length=10)),
+                ('offer_count', models.PositiveIntegerField(default=0)),
+                ('min_offer_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('max_offer_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('last_offer_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('Confirmed_provider', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='provider.provider')),
+                ('accepted_offer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='service.archivedoffer')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='service.service')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivedoffer',
+            name='Order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='offers', to='service.archivedorder'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderMedia',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('file', models.FileField(storage=service.storage.order_media_storage, upload_to='order_media/')),
+                ('uploaded_at', models.DateTimeField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='media', to='service.archivedorder')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['client', 'created_at', 'id'], name='archived_order_client_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_accepted_at(apps, schema_editor):
+    # The acceptance time was not recorded: the last change is the closest value we have
+    for name in ('Order', 'ArchivedOrder'):
+        model = apps.get_model('service', name)
+        model.objects.filter(state__in=('accepted', 'completed')).update(accepted_at=models.F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0018_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedorder',
+            name='accepted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='accepted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='ServiceDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True)),
+                ('orders_created', models.PositiveIntegerField(default=0)),
+                ('offers_created', models.PositiveIntegerField(default=0)),
+                ('offers_declined', models.PositiveIntegerField(default=0)),
+                ('first_offers', models.PositiveIntegerField(default=0)),
+                ('response_seconds', models.BigIntegerField(default=0)),
+                ('orders_accepted', models.PositiveIntegerField(default=0)),
+                ('accepted_price_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('accepted_prices', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='service.service')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('service', 'day'), name='unique_service_day_stats')],
+            },
+        ),
+        migrations.RunPython(backfill_accepted_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0019_service_daily_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServicePriceSketch',
+            fields=[
+                ('service', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='price_sketch', serialize=False, to='service.service')),
+                ('sketch', models.BinaryField(default=bytes)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('p25', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('p50', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('p75', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
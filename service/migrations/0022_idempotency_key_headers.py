@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0021_order_dedup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='headers',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
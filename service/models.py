@@ -1,7 +1,13 @@
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import Exists, F, OuterRef, Prefetch, Q, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 from provider.models import Provider
+from serviceLink.geo import locate
+from .storage import order_media_storage
 
 
 # Create your models here. 
@@ -18,6 +24,33 @@ class Service(models.Model):
     
 
 
+class OrderQuerySet(models.QuerySet):
+    def for_summary(self):
+        """Load what OrderListSerializer touches: offers are summarized by columns."""
+        return self.select_related('client').defer('search_vector').prefetch_related('media')
+
+    def for_listing(self):
+        """Load everything OrderSerializer touches in a fixed number of queries."""
+        return self.select_related(
+            'client',
+            'accepted_offer__provider__user',
+        ).defer('search_vector').prefetch_related(
+            Prefetch('offers', queryset=offer.objects.select_related('provider__user')),
+            'media',
+        )
+
+    def available_for(self, provider):
+        """
+        Pending orders of the provider's service, open or assigned to it, that
+        the provider has not answered yet (index-backed NOT EXISTS anti-join).
+        """
+        answered = offer.objects.filter(provider=provider, Order=OuterRef('pk'))
+        return self.filter(
+            Q(service=provider.service_id, state='pending')
+            & (Q(Confirmed_provider=None) | Q(Confirmed_provider=provider))
+        ).filter(~Exists(answered))
+
+
 class Order(models.Model):
     STATES = (
         ('pending', 'Pending'),
@@ -34,6 +67,10 @@ class Order(models.Model):
     title = models.CharField(max_length=100)
     description = models.TextField()
     location = models.CharField(max_length=150)
+    # Resolved from `location` by the offline gazetteer on save (serviceLink.geo)
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False, db_index=True)
 
 
     # the order can have many offers and offer can only be assigned to one order
@@ -47,9 +84,61 @@ class Order(models.Model):
 
     state = models.CharField(max_length=10, choices=STATES, default='pending')
 
+    # Aggregates of the order's offers (rejections excluded), kept up to date by record_offer()
+    offer_count = models.PositiveIntegerField(default=0, editable=False)
+    min_offer_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+    max_offer_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+    last_offer_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Set by accept_offer (service.stats rolls acceptances up by this day)
+    accepted_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Earlier pending order of the same client found nearly identical by service.dedup.
+    # No constraint: the id stays meaningful once that order is archived (same id)
+    duplicate_of = models.ForeignKey(
+        'self', on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, editable=False, related_name='duplicates',
+    )
+
     
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # tsvector over title/description/location, maintained by a database trigger
+    # on PostgreSQL (see migration 0014); unused on SQLite, which has an FTS5 table
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['client', 'created_at', 'id'], name='order_client_created_idx'),
+            models.Index(fields=['service', 'Confirmed_provider', 'created_at'], name='order_feed_idx'),
+            models.Index(
+                fields=['service', 'created_at'],
+                condition=Q(state='pending'),
+                name='order_pending_idx',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        locate(self)
+        super().save(*args, **kwargs)
+
+    def record_offer(self, new_offer):
+        """Fold a newly created offer into the aggregates with a single atomic UPDATE."""
+        if not new_offer.accepted:
+            # A rejection is not a bid: the aggregates do not change
+            return
+        changes = {
+            'offer_count': F('offer_count') + 1,
+            'last_offer_at': Greatest(Coalesce('last_offer_at', Value(new_offer.created_at)), Value(new_offer.created_at)),
+            'updated_at': timezone.now(),
+        }
+        if new_offer.proposed_price is not None:
+            price = Value(new_offer.proposed_price, output_field=self._meta.get_field('min_offer_price'))
+            changes['min_offer_price'] = Least(Coalesce('min_offer_price', price), price)
+            changes['max_offer_price'] = Greatest(Coalesce('max_offer_price', price), price)
+        Order.objects.filter(pk=self.pk).update(**changes)
+        self.refresh_from_db(fields=['offer_count', 'min_offer_price', 'max_offer_price', 'last_offer_at', 'updated_at'])
 
     def __str__(self):
         return self.title
@@ -64,7 +153,15 @@ class offer(models.Model):
     #status boolean true ou flase
     accepted = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['Order', 'created_at', 'id'], name='offer_order_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'Order'], name='unique_offer_per_provider'),
+        ]
 
     def __str__(self):
         return f"Offer from {self.provider.user.username} for order {self.Order.title}"
@@ -73,8 +170,196 @@ class offer(models.Model):
     
 class OrderMedia(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='media')
-    file = models.FileField(upload_to='order_media/')
+    file = models.FileField(upload_to='order_media/', storage=order_media_storage)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Media for order: {self.order.title}"
\ No newline at end of file
+        return f"Media for order: {self.order.title}"
+
+
+class MediaBlob(models.Model):
+    # One row per stored file of ContentAddressedStorage, refcounted by OrderMedia rows.
+    # At refcount 0 the row stays until the file is deleted, under its row lock
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField()
+    refcount = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def acquire(cls, name, sha256, size):
+        # Locked: waits for a pending deletion of the file, or keeps it from starting
+        with transaction.atomic():
+            blob, created = cls.objects.select_for_update().get_or_create(name=name, defaults={'sha256': sha256, 'size': size})
+            if not created:
+                cls.objects.filter(pk=blob.pk).update(refcount=models.F('refcount') + 1)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+
+
+class ProviderFeedEntry(models.Model):
+    # Denormalized copy of Order.objects.available_for(provider), maintained by service.feed
+    provider = models.ForeignKey(Provider, on_delete=models.CASCADE, related_name='feed_entries')
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='feed_entries')
+    created_at = models.DateTimeField()
+    # Copied from the order so radius queries stay on this table
+    geohash = models.CharField(max_length=12, blank=True, default='')
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['provider', 'created_at', 'order'], name='feed_provider_created_idx'),
+            models.Index(fields=['provider', 'geohash'], name='feed_provider_geohash_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'order'], name='unique_feed_entry'),
+        ]
+
+    def __str__(self):
+        return f"Feed entry: order {self.order_id} for provider {self.provider_id}"
+
+
+# Archive of terminal orders, filled by service.archive. Rows keep the id they
+# had in the hot tables, so cursors and client references stay valid.
+class ArchivedOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    client = models.ForeignKey(User, on_delete=models.CASCADE)
+    Confirmed_provider = models.ForeignKey(Provider, on_delete=models.CASCADE, null=True, blank=True)
+    service = models.ForeignKey(Service, on_delete=models.CASCADE)
+
+    title = models.CharField(max_length=100)
+    description = models.TextField()
+    location = models.CharField(max_length=150)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, default='')
+
+    accepted_offer = models.ForeignKey("service.ArchivedOffer", on_delete=models.CASCADE, null=True, blank=True)
+
+    proposed_price_range_min = models.DecimalField(max_digits=10, decimal_places=2)
+    proposed_price_range_max = models.DecimalField(max_digits=10, decimal_places=2)
+    final_price = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=5, default='TND')
+    state = models.CharField(max_length=10, choices=Order.STATES)
+
+    offer_count = models.PositiveIntegerField(default=0)
+    min_offer_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_offer_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    last_offer_at = models.DateTimeField(null=True, blank=True)
+    accepted_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['client', 'created_at', 'id'], name='archived_order_client_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class ArchivedOffer(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    provider = models.ForeignKey(Provider, on_delete=models.CASCADE)
+    Order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='offers')
+    proposed_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    description = models.TextField(null=True, blank=True)
+    accepted = models.BooleanField(default=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Archived offer {self.id} for order {self.Order_id}"
+
+
+class ArchivedOrderMedia(models.Model):
+    # Holds its own reference on the MediaBlob, like OrderMedia
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='media')
+    file = models.FileField(upload_to='order_media/', storage=order_media_storage)
+    uploaded_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Archived media for order: {self.order_id}"
+
+
+class IdempotencyKey(models.Model):
+    # One row per (user, Idempotency-Key) of a POST, see service.idempotency
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    # Null while the first request is still running
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.BinaryField(null=True, blank=True)
+    # Headers set by the view (Duplicate-Of, ETag, ...), sent back on replay
+    headers = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"Idempotency key {self.key} of user {self.user_id}"
+
+
+class ServiceDailyStats(models.Model):
+    # Marketplace activity per (service, day), maintained by service.stats
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField(db_index=True)
+    orders_created = models.PositiveIntegerField(default=0)
+    offers_created = models.PositiveIntegerField(default=0)
+    offers_declined = models.PositiveIntegerField(default=0)
+    # Orders that received their first offer that day, and the summed delays since their creation
+    first_offers = models.PositiveIntegerField(default=0)
+    response_seconds = models.BigIntegerField(default=0)
+    orders_accepted = models.PositiveIntegerField(default=0)
+    accepted_price_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Log-bucketed histogram of accepted prices {bucket: count}, see service.stats
+    accepted_prices = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['service', 'day'], name='unique_service_day_stats'),
+        ]
+
+    def __str__(self):
+        return f"Stats of service {self.service_id} on {self.day}"
+
+
+class ServicePriceSketch(models.Model):
+    # Quantile sketch of the accepted prices of a service (service.sketch), see service.price_hints
+    service = models.OneToOneField(Service, on_delete=models.CASCADE, primary_key=True, related_name='price_sketch')
+    sketch = models.BinaryField(default=bytes)
+    count = models.PositiveIntegerField(default=0)
+    # Read by the price_hint endpoint without decoding the sketch
+    p25 = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    p50 = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    p75 = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Price sketch of service {self.service_id} ({self.count} prices)"
+
+
+class OrderBand(models.Model):
+    # LSH index of the MinHash signatures of orders (service.dedup), one row per band
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='bands')
+    client = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['client', 'key'], name='order_band_client_key_idx'),
+        ]
+
+    def __str__(self):
+        return f"Band {self.key >> 32} of order {self.order_id}"
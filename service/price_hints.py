@@ -0,0 +1,62 @@
+"""
+Price suggestions per service from the prices of accepted offers.
+
+Each service has one ServicePriceSketch row: a service.sketch.QuantileSketch
+of every accepted price, updated by accept_offer in its transaction, with
+p25/p50/p75 kept in columns so that the price_hint endpoint reads a single row
+without decoding anything. `python manage.py rebuild_price_sketches`
+recomputes the sketches from the hot and archived orders.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import ArchivedOrder, Order, ServicePriceSketch
+from .sketch import QuantileSketch
+
+QUANTILES = (0.25, 0.5, 0.75)
+CENT = Decimal('0.01')
+
+
+def _save(row, sketch):
+    row.sketch = sketch.to_bytes()
+    row.count = sketch.count
+    row.p25, row.p50, row.p75 = (
+        None if value is None else Decimal(value).quantize(CENT) for value in sketch.quantiles(*QUANTILES)
+    )
+    row.save()
+
+
+def record_price(service_id, price):
+    """Fold an accepted price into the service's sketch."""
+    if price is None:
+        return
+    with transaction.atomic():
+        ServicePriceSketch.objects.get_or_create(service_id=service_id)
+        row = ServicePriceSketch.objects.select_for_update().get(service_id=service_id)
+        _save(row, QuantileSketch.from_bytes(row.sketch).add(price))
+
+
+def rebuild(service_id):
+    """Recompute a service's sketch from all its accepted offers, archived ones included."""
+    sketch = QuantileSketch()
+    for model in (Order, ArchivedOrder):
+        prices = (
+            model.objects.filter(service_id=service_id, accepted_offer__proposed_price__isnull=False)
+            .values_list('accepted_offer__proposed_price', flat=True)
+        )
+        for price in prices.iterator(chunk_size=5000):
+            sketch.add(price)
+    with transaction.atomic():
+        row, _ = ServicePriceSketch.objects.select_for_update().get_or_create(service_id=service_id)
+        _save(row, sketch)
+    return sketch.count
+
+
+def hint(service_id):
+    """{count, p25, p50, p75}; quantiles are None below PRICE_HINT_MIN_SAMPLES prices."""
+    row = ServicePriceSketch.objects.filter(service_id=service_id).values('count', 'p25', 'p50', 'p75').first()
+    if row is None or row['count'] < settings.PRICE_HINT_MIN_SAMPLES:
+        return {'count': row['count'] if row else 0, 'p25': None, 'p50': None, 'p75': None}
+    return {'count': row['count'], **{name: str(row[name]) for name in ('p25', 'p50', 'p75')}}
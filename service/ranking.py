@@ -0,0 +1,232 @@
+"""
+Relevance ranking of the provider feed.
+
+The pending orders of a service are loaded once into column arrays
+(ServiceFeatures) and kept in a per-process cache for RANKING_FEATURE_TTL
+seconds. Ranking a provider's feed is then a single vectorized pass over those
+arrays: a mask for what the provider may see, four scores in [0, 1] combined
+with RANKING_WEIGHTS, and an argpartition for the top k.
+
+- price: how well the order's proposed range fits the provider's usual price
+  (median of its past offers, or of the service's offers when it has none)
+- distance: exponential decay with RANKING_DISTANCE_SCALE_KM
+- recency: halves every RANKING_RECENCY_HALF_LIFE_HOURS
+- competition: 1 / (1 + number of offers already made on the order)
+
+Orders created since the arrays were loaded are appended on every call
+(ServiceFeatures.extended(), an id range), so a new order ranks right away.
+Other cached columns may be a few seconds stale, so callers re-check the
+returned ids against the database (see rank_feed()).
+"""
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from serviceLink.geo import EARTH_RADIUS_KM
+from .models import Order, offer
+
+DEFAULT_WEIGHTS = {'price': 0.35, 'distance': 0.3, 'recency': 0.2, 'competition': 0.15}
+NEUTRAL_SCORE = 0.5
+COLUMNS = ('ids', 'created_at', 'price_min', 'price_max', 'latitude', 'longitude', 'offer_count', 'confirmed_provider')
+
+
+class ServiceFeatures:
+    """Column arrays describing the pending orders of one service."""
+
+    def __init__(self, ids, created_at, price_min, price_max, latitude, longitude, offer_count, confirmed_provider,
+                 service_price=None):
+        self.ids = ids
+        self.created_at = created_at
+        self.price_min = price_min
+        self.price_max = price_max
+        self.latitude = latitude
+        self.longitude = longitude
+        self.offer_count = offer_count
+        self.confirmed_provider = confirmed_provider
+        self.service_price = service_price
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, service_id):
+        service_price = _median_price(offer.objects.filter(Order__service=service_id))
+        return cls.from_rows(cls._pending_rows(service_id), service_price)
+
+    @staticmethod
+    def _pending_rows(service_id, after_id=0):
+        return list(
+            Order.objects.filter(service=service_id, state='pending', id__gt=after_id)
+            .order_by('id')
+            .values_list(
+                'id', 'created_at', 'proposed_price_range_min', 'proposed_price_range_max',
+                'latitude', 'longitude', 'offer_count', 'Confirmed_provider',
+            )
+            .iterator(chunk_size=10_000)
+        )
+
+    @classmethod
+    def from_rows(cls, rows, service_price=None):
+        if not rows:
+            return cls.empty(service_price)
+        ids, created_at, price_min, price_max, latitude, longitude, offer_count, confirmed = zip(*rows)
+        return cls(
+            ids=np.fromiter(ids, dtype=np.int64, count=len(rows)),
+            created_at=np.fromiter((value.timestamp() for value in created_at), dtype=np.float64, count=len(rows)),
+            price_min=np.array(price_min, dtype=np.float64),
+            price_max=np.array(price_max, dtype=np.float64),
+            latitude=np.array([np.nan if value is None else value for value in latitude], dtype=np.float64),
+            longitude=np.array([np.nan if value is None else value for value in longitude], dtype=np.float64),
+            offer_count=np.array(offer_count, dtype=np.float64),
+            confirmed_provider=np.fromiter((value or 0 for value in confirmed), dtype=np.int64, count=len(rows)),
+            service_price=service_price,
+        )
+
+    def extended(self, service_id):
+        """These features plus the pending orders created after they were loaded (higher ids)."""
+        rows = self._pending_rows(service_id, after_id=int(self.ids[-1]) if len(self) else 0)
+        if not rows:
+            return self
+        newer = self.from_rows(rows)
+        features = ServiceFeatures(
+            *(np.concatenate((getattr(self, column), getattr(newer, column))) for column in COLUMNS),
+            service_price=self.service_price,
+        )
+        features.built_at = self.built_at
+        return features
+
+    @classmethod
+    def empty(cls, service_price=None):
+        return cls(*(np.empty(0, dtype=dtype) for dtype in (
+            np.int64, np.float64, np.float64, np.float64, np.float64, np.float64, np.float64, np.int64,
+        )), service_price=service_price)
+
+
+class FeatureCache:
+    """Per-process ServiceFeatures cache with a TTL and single-flight rebuilds."""
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._entries = {}
+        self._mutex = threading.Lock()
+        self._locks = {}
+
+    def get(self, service_id):
+        features = self._entries.get(service_id)
+        if features is not None and time.monotonic() - features.built_at < self.ttl:
+            return features
+        with self._mutex:
+            lock = self._locks.setdefault(service_id, threading.Lock())
+        with lock:
+            features = self._entries.get(service_id)
+            if features is None or time.monotonic() - features.built_at >= self.ttl:
+                features = ServiceFeatures.load(service_id)
+                self._entries[service_id] = features
+            return features
+
+    def invalidate(self, service_id=None):
+        with self._mutex:
+            if service_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(service_id, None)
+
+
+feature_cache = FeatureCache(ttl=getattr(settings, 'RANKING_FEATURE_TTL', 30))
+
+
+def _median_price(queryset):
+    prices = np.array(
+        queryset.filter(accepted=True, proposed_price__isnull=False)
+        .order_by('-created_at').values_list('proposed_price', flat=True)[:500],
+        dtype=np.float64,
+    )
+    return float(np.median(prices)) if prices.size else None
+
+
+def typical_price(provider, features=None):
+    """Median of the provider's recent offer prices, else of its service's (cached with the features)."""
+    price = _median_price(offer.objects.filter(provider=provider))
+    if price is None and features is not None:
+        price = features.service_price
+    return price
+
+
+def score(features, now, price=None, latitude=None, longitude=None, weights=None):
+    """Vectorized relevance scores for every row of `features`, and distances in km (NaN if unknown)."""
+    weights = weights or getattr(settings, 'RANKING_WEIGHTS', DEFAULT_WEIGHTS)
+    size = len(features)
+
+    if price is None:
+        price_score = np.full(size, NEUTRAL_SCORE)
+    else:
+        # 1 inside the proposed range, decaying with the relative gap outside of it
+        gap = np.maximum(features.price_min - price, 0) + np.maximum(price - features.price_max, 0)
+        price_score = np.exp(-gap / max(price, 1.0))
+
+    if latitude is None or longitude is None:
+        distance = np.full(size, np.nan)
+    else:
+        lat1, lng1 = np.radians(latitude), np.radians(longitude)
+        lat2, lng2 = np.radians(features.latitude), np.radians(features.longitude)
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+        distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+    distance_scale = getattr(settings, 'RANKING_DISTANCE_SCALE_KM', 10)
+    distance_score = np.where(np.isnan(distance), NEUTRAL_SCORE, np.exp(-np.nan_to_num(distance) / distance_scale))
+
+    half_life = getattr(settings, 'RANKING_RECENCY_HALF_LIFE_HOURS', 48) * 3600
+    recency_score = np.exp2(-np.maximum(now - features.created_at, 0) / half_life)
+
+    competition_score = 1 / (1 + features.offer_count)
+
+    scores = (
+        weights['price'] * price_score
+        + weights['distance'] * distance_score
+        + weights['recency'] * recency_score
+        + weights['competition'] * competition_score
+    )
+    return scores, distance
+
+
+def top_k(features, scores, mask, k):
+    """Indices of the k best rows where mask is set, best first (ties: newest first)."""
+    candidates = np.flatnonzero(mask)
+    if candidates.size > k:
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    return candidates[np.lexsort((-features.created_at[candidates], -scores[candidates]))]
+
+
+def rank_feed(provider, k=20, latitude=None, longitude=None, radius_km=None):
+    """
+    Top k [(order_id, score, distance_km)] of the provider's feed.
+
+    Rows the provider may not see (assigned elsewhere, already answered, out
+    of radius) are masked out; a few extra rows are ranked and then re-checked
+    against Order.objects.available_for() to absorb cache staleness.
+    """
+    features = feature_cache.get(provider.service_id).extended(provider.service_id)
+    if latitude is None and longitude is None:
+        latitude, longitude = provider.latitude, provider.longitude
+
+    scores, distance = score(
+        features, timezone.now().timestamp(), price=typical_price(provider, features), latitude=latitude, longitude=longitude,
+    )
+    answered = np.fromiter(
+        offer.objects.filter(provider=provider, Order__state='pending').values_list('Order', flat=True),
+        dtype=np.int64,
+    )
+    mask = np.isin(features.confirmed_provider, (0, provider.id)) & ~np.isin(features.ids, answered)
+    if radius_km is not None:
+        mask &= distance <= radius_km
+
+    best = top_k(features, scores, mask, k + max(k // 2, 5))
+    available = set(Order.objects.available_for(provider).filter(id__in=features.ids[best].tolist()).values_list('id', flat=True))
+    ranked = [
+        (int(features.ids[i]), float(scores[i]), None if np.isnan(distance[i]) else float(distance[i]))
+        for i in best if features.ids[i] in available
+    ]
+    return ranked[:k]
@@ -0,0 +1,76 @@
+"""
+Live updates of the provider feed over WebSocket (chat.consumers.OrderFeedConsumer).
+
+Approved providers connected to ws/orders/ are subscribed to the group of their
+service and to a personal group. Views publish, once their transaction has
+committed:
+- order.added: a compact summary of a new pending order, to the service group,
+  or only to the assigned provider when the order has a Confirmed_provider;
+- order.removed: the order id, when it leaves the feed (accepted, cancelled).
+
+Publishing is best effort: a channel layer failure is logged and never fails
+the request. Clients still fall back to list_provider_available_orders.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from serviceLink.projection import SparseFieldset
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELDS = [
+    'id', 'service', 'Confirmed_provider', 'title', 'location', 'latitude', 'longitude',
+    'proposed_price_range_min', 'proposed_price_range_max', 'currency', 'offer_count', 'created_at',
+]
+
+
+def service_group(service_id):
+    return f'orders_service_{service_id}'
+
+
+def provider_group(provider_id):
+    return f'orders_provider_{provider_id}'
+
+
+def summarize(order):
+    from .serializers import OrderListSerializer
+
+    return SparseFieldset(OrderListSerializer, SUMMARY_FIELDS).serialize([order])[0]
+
+
+def _send(group, event):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(group, event)
+    except Exception as e:
+        logger.error(f"Feed publication to {group} failed: {e}")
+
+
+def _target(order):
+    if order.Confirmed_provider_id:
+        return provider_group(order.Confirmed_provider_id)
+    return service_group(order.service_id)
+
+
+def publish_added(orders):
+    """Announce new pending orders after the current transaction commits."""
+    events = [(_target(order), {'type': 'order.added', 'order': summarize(order)}) for order in orders if order.state == 'pending']
+
+    def send():
+        for group, event in events:
+            _send(group, event)
+
+    if events:
+        transaction.on_commit(send)
+
+
+def publish_removed(order):
+    """Announce that an order left the feed after the current transaction commits."""
+    # Sent to the whole service: the order may have been visible to any of its providers
+    event = {'type': 'order.removed', 'order_id': order.id}
+    transaction.on_commit(lambda: _send(service_group(order.service_id), event))
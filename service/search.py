@@ -0,0 +1,119 @@
+"""
+Full-text search over orders.
+
+PostgreSQL: GIN-indexed Order.search_vector (kept up to date by a trigger),
+ranked with ts_rank. SQLite: the service_order_fts FTS5 table, ranked with
+bm25. Both return the same (order, rank) pairs, higher rank first; other
+databases find nothing.
+
+SQLite drops the FTS5 sync triggers whenever a migration rebuilds
+service_order (any later AddField/AlterField on Order): ensure_sqlite_triggers
+runs after every migrate to recreate them and re-index the orders.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection, connections
+from django.db.models import F
+
+from .models import Order
+
+SEARCH_CONFIG = 'simple'
+_token_re = re.compile(r'\w+', re.UNICODE)
+
+SQLITE_TRIGGERS = {
+    'service_order_fts_insert': """
+        CREATE TRIGGER IF NOT EXISTS service_order_fts_insert AFTER INSERT ON service_order BEGIN
+            INSERT INTO service_order_fts(rowid, title, description, location)
+            VALUES (new.id, new.title, new.description, new.location);
+        END
+    """,
+    'service_order_fts_delete': """
+        CREATE TRIGGER IF NOT EXISTS service_order_fts_delete AFTER DELETE ON service_order BEGIN
+            INSERT INTO service_order_fts(service_order_fts, rowid, title, description, location)
+            VALUES ('delete', old.id, old.title, old.description, old.location);
+        END
+    """,
+    'service_order_fts_update': """
+        CREATE TRIGGER IF NOT EXISTS service_order_fts_update AFTER UPDATE OF title, description, location ON service_order BEGIN
+            INSERT INTO service_order_fts(service_order_fts, rowid, title, description, location)
+            VALUES ('delete', old.id, old.title, old.description, old.location);
+            INSERT INTO service_order_fts(rowid, title, description, location)
+            VALUES (new.id, new.title, new.description, new.location);
+        END
+    """,
+}
+
+
+def ensure_sqlite_triggers(using='default'):
+    """Recreate missing FTS5 sync triggers and rebuild the index; True if any was missing."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+            ['service_order_fts', *SQLITE_TRIGGERS],
+        )
+        existing = {name for name, in cursor.fetchall()}
+        missing = [name for name in SQLITE_TRIGGERS if name not in existing]
+        # No FTS table: migrated backwards past 0014_order_search
+        if 'service_order_fts' not in existing or not missing:
+            return False
+        for name in missing:
+            cursor.execute(SQLITE_TRIGGERS[name])
+        cursor.execute("INSERT INTO service_order_fts(service_order_fts) VALUES ('rebuild')")
+    return True
+
+
+def search_orders(text, service_id=None, state=None, client_id=None, limit=20):
+    """[(order, rank)] for the orders matching every word of `text`."""
+    if not _token_re.search(text or ''):
+        return []
+    if connection.vendor == 'postgresql':
+        return _search_postgres(text, service_id, state, client_id, limit)
+    if connection.vendor == 'sqlite':
+        return _search_sqlite(text, service_id, state, client_id, limit)
+    return []
+
+
+def _search_postgres(text, service_id, state, client_id, limit):
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    orders = Order.objects.for_summary().filter(search_vector=query)
+    if service_id:
+        orders = orders.filter(service=service_id)
+    if client_id:
+        orders = orders.filter(client=client_id)
+    if state:
+        orders = orders.filter(state=state)
+    orders = orders.annotate(rank=SearchRank(F('search_vector'), query)).order_by('-rank', '-created_at')[:limit]
+    return [(order, order.rank) for order in orders]
+
+
+def _search_sqlite(text, service_id, state, client_id, limit):
+    # Quote every token so user input is never parsed as FTS5 syntax; the last
+    # one is a prefix match for search-as-you-type
+    tokens = _token_re.findall(text)
+    match = ' '.join(f'"{token}"' for token in tokens[:-1]) + f' "{tokens[-1]}"*'
+    sql = [
+        'SELECT o.id, -bm25(service_order_fts, 10.0, 4.0, 1.0) AS rank',
+        'FROM service_order_fts JOIN service_order o ON o.id = service_order_fts.rowid',
+        'WHERE service_order_fts MATCH %s',
+    ]
+    params = [match.strip()]
+    if service_id:
+        sql.append('AND o.service_id = %s')
+        params.append(service_id)
+    if client_id:
+        sql.append('AND o.client_id = %s')
+        params.append(client_id)
+    if state:
+        sql.append('AND o.state = %s')
+        params.append(state)
+    sql.append('ORDER BY rank DESC, o.created_at DESC LIMIT %s')
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(' '.join(sql), params)
+        ranked = cursor.fetchall()
+    orders = Order.objects.for_summary().in_bulk([order_id for order_id, _ in ranked])
+    return [(orders[order_id], rank) for order_id, rank in ranked if order_id in orders]
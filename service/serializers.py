@@ -1,5 +1,25 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
 from .models import Order, offer, Service, OrderMedia
+from .cache import get_service
+from serviceLink.thumbnails import variant_urls
+
+
+class CachedServiceField(serializers.PrimaryKeyRelatedField):
+    """Service primary key field resolved through the catalog cache."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('queryset', Service.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        service = get_service(data)
+        if service is None:
+            self.fail('does_not_exist', pk_value=data)
+        return service
+
 
 class ServiceSerializer(serializers.ModelSerializer):
     class Meta:
@@ -15,11 +35,17 @@ class OfferSerializer(serializers.ModelSerializer):
 
 
 class OrderMediaSerializer(serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
+
     class Meta:
         model = OrderMedia
         fields = '__all__'
 
+    def get_variants(self, obj):
+        return variant_urls(obj.file)
+
 class OrderSerializer(serializers.ModelSerializer):
+    service = CachedServiceField()
     client_name = serializers.CharField(source='client.username', read_only=True)
     offers = OfferSerializer(many=True, read_only=True)
     accepted_offer = OfferSerializer(read_only=True)
@@ -27,7 +53,12 @@ class OrderSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Order
-        fields = '__all__'
+        exclude = ['search_vector']
+        # Relations loaded for nested fields requested through ?expand= (serviceLink.projection)
+        expand = {
+            'offers': [Prefetch('offers', queryset=offer.objects.select_related('provider__user'))],
+            'accepted_offer': ['accepted_offer__provider__user'],
+        }
 
     def validate(self, data):
         if data['proposed_price_range_min'] > data['proposed_price_range_max']:
@@ -42,4 +73,20 @@ class OrderSerializer(serializers.ModelSerializer):
     def validate_description(self, value):
         if len(value) < 20:
             raise serializers.ValidationError("Description is too short. It should have at least 20 characters.")
-        return value
\ No newline at end of file
+        return value
+
+class OrderListSerializer(serializers.ModelSerializer):
+    """Compact order for listings: offer aggregates instead of nested offers (see list_order_offers)."""
+    client_name = serializers.CharField(source='client.username', read_only=True)
+    media = OrderMediaSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'client', 'client_name', 'service', 'Confirmed_provider', 'accepted_offer',
+            'title', 'description', 'location', 'latitude', 'longitude',
+            'proposed_price_range_min', 'proposed_price_range_max', 'final_price', 'currency', 'state',
+            'offer_count', 'min_offer_price', 'max_offer_price', 'last_offer_at',
+            'media', 'created_at', 'updated_at',
+        ]
+        read_only_fields = fields
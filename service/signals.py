@@ -0,0 +1,26 @@
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .cache import service_cache
+from .models import ArchivedOrderMedia, OrderMedia, Service
+from .search import ensure_sqlite_triggers
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def invalidate_service_cache(sender, **kwargs):
+    service_cache.invalidate()
+
+
+@receiver(post_delete, sender=OrderMedia)
+@receiver(post_delete, sender=ArchivedOrderMedia)
+def release_order_media_file(sender, instance, **kwargs):
+    if instance.file:
+        instance.file.storage.release(instance.file.name)
+
+
+@receiver(post_migrate)
+def ensure_search_triggers(sender, using, **kwargs):
+    # Sent once per installed app: only act for this one
+    if sender.name == 'service':
+        ensure_sqlite_triggers(using)
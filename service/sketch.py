@@ -0,0 +1,121 @@
+"""
+Mergeable quantile sketch for prices (DDSketch-style log buckets).
+
+A value v > 0 falls in bucket floor(log_GAMMA(v)), which covers
+[GAMMA**i, GAMMA**(i+1)); a quantile is answered with the middle of its
+bucket, within 1% of the exact value for GAMMA = 1.02. Zero and negative
+values are counted apart. Two sketches merge by adding their bucket counts,
+so per-service sketches can be combined, rebuilt or updated one value at a
+time without keeping the values themselves.
+
+The binary form is compact: a header (version, zero count, number of
+buckets), the first bucket index, then varint-encoded (index delta, count)
+pairs. Prices between 1 and 10 000 span at most ~470 buckets.
+"""
+import math
+import struct
+
+GAMMA = 1.02
+VERSION = 1
+_HEADER = struct.Struct('<BIIi')
+
+
+def index(value):
+    """Bucket of a positive value."""
+    return math.floor(math.log(float(value), GAMMA))
+
+
+def representative(bucket):
+    """Middle of a bucket, the value answered for quantiles that fall in it."""
+    return GAMMA ** bucket * (1 + GAMMA) / 2
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, position):
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+class QuantileSketch:
+    __slots__ = ('buckets', 'zero_count')
+
+    def __init__(self, buckets=None, zero_count=0):
+        self.buckets = dict(buckets or {})
+        self.zero_count = zero_count
+
+    @property
+    def count(self):
+        return self.zero_count + sum(self.buckets.values())
+
+    def add(self, value, count=1):
+        if value <= 0:
+            self.zero_count += count
+        else:
+            bucket = index(value)
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        return self
+
+    def merge(self, other):
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.zero_count += other.zero_count
+        return self
+
+    def quantiles(self, *qs):
+        """Values at the quantiles `qs` (nearest rank), None for an empty sketch."""
+        total = self.count
+        if not total:
+            return [None] * len(qs)
+        ranks = sorted((max(math.ceil(q * total), 1), position) for position, q in enumerate(qs))
+        answers = [None] * len(qs)
+        cells = [(0.0, self.zero_count)] + [(representative(bucket), self.buckets[bucket]) for bucket in sorted(self.buckets)]
+        seen = answered = 0
+        for value, count in cells:
+            seen += count
+            while answered < len(ranks) and ranks[answered][0] <= seen:
+                answers[ranks[answered][1]] = value
+                answered += 1
+        return answers
+
+    def quantile(self, q):
+        return self.quantiles(q)[0]
+
+    def to_bytes(self):
+        buckets = sorted(self.buckets.items())
+        first = buckets[0][0] if buckets else 0
+        out = bytearray(_HEADER.pack(VERSION, self.zero_count, len(buckets), first))
+        previous = first
+        for bucket, count in buckets:
+            _write_varint(out, bucket - previous)
+            _write_varint(out, count)
+            previous = bucket
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if not data:
+            return cls()
+        data = bytes(data)
+        version, zero_count, size, bucket = _HEADER.unpack_from(data)
+        if version != VERSION:
+            raise ValueError(f"Unsupported sketch version {version}.")
+        buckets = {}
+        position = _HEADER.size
+        for _ in range(size):
+            delta, position = _read_varint(data, position)
+            count, position = _read_varint(data, position)
+            bucket += delta
+            buckets[bucket] = count
+        return cls(buckets, zero_count)
@@ -0,0 +1,49 @@
+"""
+Order state transitions as compare-and-set UPDATEs.
+
+    pending -> accepted -> completed
+    pending -> rejected
+
+Each transition is a single `UPDATE ... WHERE id = %s AND state = <expected>`
+touching only the changed columns, so two concurrent transitions on the same
+order cannot both succeed and no row lock is held across the request.
+"""
+from django.utils import timezone
+
+from .models import Order
+
+# target state -> state the order must currently be in
+TRANSITIONS = {
+    'accepted': 'pending',
+    'completed': 'accepted',
+    'rejected': 'pending',
+}
+
+
+class StateConflict(Exception):
+    def __init__(self, order, target):
+        self.order = order
+        self.target = target
+        super().__init__(
+            f"Cannot move order {order.pk} to '{target}': it is '{order.state}', "
+            f"expected '{TRANSITIONS[target]}'."
+        )
+
+
+def transition(order, target, **changes):
+    """
+    Move `order` to `target`, applying `changes` in the same UPDATE.
+
+    Updates the instance on success; raises StateConflict (with order.state
+    refreshed) when another request changed the state first.
+    """
+    expected = TRANSITIONS[target]
+    changes['updated_at'] = timezone.now()
+    updated = Order.objects.filter(pk=order.pk, state=expected).update(state=target, **changes)
+    if not updated:
+        order.state = Order.objects.filter(pk=order.pk).values_list('state', flat=True).first()
+        raise StateConflict(order, target)
+    order.state = target
+    for field, value in changes.items():
+        setattr(order, field, value)
+    return order
@@ -0,0 +1,203 @@
+"""
+Marketplace analytics rolled up per (service, day) in ServiceDailyStats.
+
+Views record events as they happen:
+- record_orders: orders created;
+- record_offer: offers made or declined, and the delay before an order's
+  first offer (day of that first offer);
+- record_acceptance: accepted orders and their final price (day of acceptance).
+
+The rollups are bumped once the view's transaction has committed
+(transaction.on_commit), each in its own short transaction: a (service, day)
+row is never held locked for the length of a view, and a rolled-back view
+counts nothing.
+
+Counters are bumped with F() updates. Accepted prices also go into a JSON
+histogram over the buckets of service.sketch (merged buckets give the median
+within 1%), which needs the row locked. A bump that fails after the commit is
+logged and skipped, the event itself is kept.
+
+`python manage.py rebuild_service_stats` recomputes whole days from the fact
+tables, hot and archived (service.archive), to backfill or repair them.
+Reports only read the rollups, O(days).
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+from . import sketch
+from .models import ArchivedOffer, ArchivedOrder, Order, ServiceDailyStats, offer
+
+DEFAULT_PERIOD_DAYS = 30
+MAX_PERIOD_DAYS = 366
+COUNTERS = (
+    'orders_created', 'offers_created', 'offers_declined', 'first_offers', 'response_seconds', 'orders_accepted',
+)
+
+
+def price_bucket(price):
+    return 'zero' if price <= 0 else str(sketch.index(price))
+
+
+def histogram_sketch(histogram):
+    buckets = {int(bucket): count for bucket, count in histogram.items() if bucket != 'zero'}
+    return sketch.QuantileSketch(buckets, histogram.get('zero', 0))
+
+
+def _apply(service_id, day, price=None, **increments):
+    with transaction.atomic():
+        ServiceDailyStats.objects.get_or_create(service_id=service_id, day=day)
+        rows = ServiceDailyStats.objects.filter(service_id=service_id, day=day)
+        if price is None:
+            rows.update(**{field: F(field) + value for field, value in increments.items()}, updated_at=timezone.now())
+            return
+        row = rows.select_for_update().get()
+        for field, value in increments.items():
+            setattr(row, field, getattr(row, field) + value)
+        bucket = price_bucket(price)
+        row.accepted_prices[bucket] = row.accepted_prices.get(bucket, 0) + 1
+        row.save()
+
+
+def _bump(service_id, day, price=None, **increments):
+    transaction.on_commit(partial(_apply, service_id, day, price, **increments), robust=True)
+
+
+def record_orders(orders):
+    created = Counter((order.service_id, timezone.localdate(order.created_at)) for order in orders)
+    for (service_id, day), count in created.items():
+        _bump(service_id, day, orders_created=count)
+
+
+def record_offer(order, new_offer):
+    """Call after order.record_offer(new_offer): order.offer_count tells a first offer."""
+    day = timezone.localdate(new_offer.created_at)
+    if not new_offer.accepted:
+        _bump(order.service_id, day, offers_declined=1)
+    elif order.offer_count == 1:
+        delay = max(int((new_offer.created_at - order.created_at).total_seconds()), 0)
+        _bump(order.service_id, day, offers_created=1, first_offers=1, response_seconds=delay)
+    else:
+        _bump(order.service_id, day, offers_created=1)
+
+
+def record_acceptance(order):
+    day = timezone.localdate(order.accepted_at)
+    if order.final_price is None:
+        _bump(order.service_id, day, orders_accepted=1)
+    else:
+        _bump(order.service_id, day, price=order.final_price, orders_accepted=1, accepted_price_total=order.final_price)
+
+
+def rebuild(since, until):
+    """Recompute the rollups of days since..until (inclusive) from orders and offers."""
+    start = timezone.make_aware(datetime.combine(since, time.min))
+    end = timezone.make_aware(datetime.combine(until + timedelta(days=1), time.min))
+    rows = defaultdict(lambda: dict.fromkeys(COUNTERS, 0) | {'accepted_price_total': Decimal(0), 'accepted_prices': {}})
+
+    # An order and its offers are either all hot or all archived
+    for order_model, offer_model in ((Order, offer), (ArchivedOrder, ArchivedOffer)):
+        created = (
+            order_model.objects.filter(created_at__gte=start, created_at__lt=end)
+            .annotate(day=TruncDate('created_at')).values('service', 'day').annotate(n=Count('id')).order_by()
+        )
+        for row in created:
+            rows[row['service'], row['day']]['orders_created'] += row['n']
+
+        offers = (
+            offer_model.objects.filter(created_at__gte=start, created_at__lt=end)
+            .annotate(day=TruncDate('created_at')).values('Order__service', 'day')
+            .annotate(made=Count('id', filter=Q(accepted=True)), declined=Count('id', filter=Q(accepted=False))).order_by()
+        )
+        for row in offers:
+            counters = rows[row['Order__service'], row['day']]
+            counters['offers_created'] += row['made']
+            counters['offers_declined'] += row['declined']
+
+        first_offers = (
+            order_model.objects.annotate(first_offer_at=Min('offers__created_at', filter=Q(offers__accepted=True)))
+            .filter(first_offer_at__gte=start, first_offer_at__lt=end)
+            .values_list('service_id', 'created_at', 'first_offer_at')
+        )
+        for service_id, created_at, first_offer_at in first_offers.iterator():
+            row = rows[service_id, timezone.localdate(first_offer_at)]
+            row['first_offers'] += 1
+            row['response_seconds'] += max(int((first_offer_at - created_at).total_seconds()), 0)
+
+        accepted = (
+            order_model.objects.filter(accepted_at__gte=start, accepted_at__lt=end)
+            .values_list('service_id', 'accepted_at', 'final_price')
+        )
+        for service_id, accepted_at, final_price in accepted.iterator():
+            row = rows[service_id, timezone.localdate(accepted_at)]
+            row['orders_accepted'] += 1
+            if final_price is not None:
+                row['accepted_price_total'] += final_price
+                bucket = price_bucket(final_price)
+                row['accepted_prices'][bucket] = row['accepted_prices'].get(bucket, 0) + 1
+
+    with transaction.atomic():
+        ServiceDailyStats.objects.filter(day__gte=since, day__lte=until).delete()
+        ServiceDailyStats.objects.bulk_create(
+            ServiceDailyStats(service_id=service_id, day=day, **values) for (service_id, day), values in rows.items()
+        )
+    return len(rows)
+
+
+def summarize(rows):
+    """Metrics of ServiceDailyStats rows (as .values() dicts) taken together."""
+    totals = dict.fromkeys(COUNTERS, 0)
+    price_total = Decimal(0)
+    histogram = Counter()
+    for row in rows:
+        for field in COUNTERS:
+            totals[field] += row[field]
+        price_total += row['accepted_price_total']
+        histogram.update(row['accepted_prices'])
+
+    median = histogram_sketch(histogram).quantile(0.5)
+    return {
+        'orders_created': totals['orders_created'],
+        'offers_created': totals['offers_created'],
+        'offers_declined': totals['offers_declined'],
+        'orders_accepted': totals['orders_accepted'],
+        # Acceptances of the period over orders created in the period
+        'acceptance_rate': round(totals['orders_accepted'] / totals['orders_created'], 4) if totals['orders_created'] else None,
+        'avg_first_offer_minutes': round(totals['response_seconds'] / totals['first_offers'] / 60, 1) if totals['first_offers'] else None,
+        'avg_accepted_price': str((price_total / totals['orders_accepted']).quantize(Decimal('0.01'))) if totals['orders_accepted'] else None,
+        'median_accepted_price': str(Decimal(median).quantize(Decimal('0.01'))) if median is not None else None,
+    }
+
+
+def period(params):
+    """(since, until) dates from ?since=&until= (ISO dates), the last 30 days by default."""
+    days = {}
+    for name in ('since', 'until'):
+        value = params.get(name)
+        if value:
+            try:
+                days[name] = parse_date(value)
+            except ValueError:
+                days[name] = None
+            if days[name] is None:
+                raise ValidationError({name: "Expected an ISO date (YYYY-MM-DD)."})
+    until = days.get('until') or timezone.localdate()
+    since = days.get('since') or until - timedelta(days=DEFAULT_PERIOD_DAYS - 1)
+    if since > until:
+        raise ValidationError({"since": "Must not be after until."})
+    if (until - since).days >= MAX_PERIOD_DAYS:
+        raise ValidationError({"since": f"The period is limited to {MAX_PERIOD_DAYS} days."})
+    return since, until
+
+
+def rollups(since, until, **filters):
+    fields = ('service', 'service__name', 'day', *COUNTERS, 'accepted_price_total', 'accepted_prices')
+    return ServiceDailyStats.objects.filter(day__gte=since, day__lte=until, **filters).values(*fields).order_by('day')
@@ -0,0 +1,112 @@
+"""
+Content-addressed storage for order media.
+
+HashingFileUploadHandler streams every upload to a temporary file and computes
+its SHA-256 in the same pass. ContentAddressedStorage then stores the file
+under order_media/<aa>/<sha256><ext>: an identical file already on disk is not
+written again, and MediaBlob keeps one reference per OrderMedia row so the
+file is removed only when its last reference goes away.
+
+Files are written when the saving transaction commits, so a rollback leaves
+nothing behind. Acquiring a blob and deleting an unreferenced file both hold
+the MediaBlob row lock, so a file is never deleted under a new reference.
+"""
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.core.files.utils import validate_file_name
+from django.db import transaction
+from django.db.models import F
+
+from serviceLink.thumbnails import variant_name, variant_widths
+
+
+class HashingFileUploadHandler(TemporaryFileUploadHandler):
+    """Stream uploads to disk and hash them chunk by chunk."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.sha256.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        uploaded.sha256 = self.sha256.hexdigest()
+        return uploaded
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def save(self, name, content, max_length=None):
+        from .models import MediaBlob
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = getattr(content, 'sha256', None) or self.hash_content(content)
+
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        name = os.path.join(directory, digest[:2], digest + extension).replace('\\', '/')
+        validate_file_name(name, allow_relative_path=True)
+
+        MediaBlob.acquire(name, digest, content.size)
+        transaction.on_commit(lambda: self._write_missing(name, content))
+        return name
+
+    def _write_missing(self, name, content):
+        if self.exists(name):
+            return
+        content.seek(0)
+        saved = self._save(name, content)
+        if saved != name:
+            # Same content written concurrently under the expected name: drop our copy
+            self.delete(saved)
+
+    def release(self, name):
+        """Drop one reference to `name`, deleting the file with the last one."""
+        from .models import MediaBlob
+
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                # Uploaded before content addressing, owned by a single row
+                return
+            MediaBlob.objects.filter(pk=blob.pk).update(refcount=F('refcount') - 1)
+            if blob.refcount == 1:
+                transaction.on_commit(lambda: self._delete_if_unreferenced(name))
+
+    def _delete_if_unreferenced(self, name):
+        from .models import MediaBlob
+
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            # The same content may have been uploaded again in the meantime
+            if blob is None or blob.refcount > 0:
+                return
+            self.delete(name)
+            for width in variant_widths():
+                self.delete(variant_name(name, width))
+            blob.delete()
+
+    @staticmethod
+    def hash_content(content):
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        content.seek(0)
+        return sha256.hexdigest()
+
+
+_order_media_storage = ContentAddressedStorage()
+
+
+def order_media_storage():
+    return _order_media_storage
@@ -1,3 +1,589 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import orjson
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from provider.models import Provider
+from service import archive, dedup, stats
+from service.models import (
+    ArchivedOrder, ArchivedOrderMedia, IdempotencyKey, MediaBlob, Order, OrderMedia, Service, ServiceDailyStats, offer,
+)
+from service.state_machine import StateConflict, transition
+from service.storage import order_media_storage
+
+
+class OrderSearchTests(TestCase):
+    def setUp(self):
+        self.service = Service.objects.create(name='Plomberie', description='Plomberie')
+        self.client_user = User.objects.create_user(username='client', password='x')
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+
+    def create_order(self, title, service=None):
+        response = self.api.post('/service/create_order/', {
+            'service_id': (service or self.service).id,
+            'title': title,
+            'description': 'Intervention rapide demandée',
+            'location': 'Tunis centre',
+            'proposed_price_range_min': '10',
+            'proposed_price_range_max': '50',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def search(self, user, q, **params):
+        api = APIClient()
+        api.force_authenticate(user)
+        response = api.get('/service/orders/search/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return [order['id'] for order in response.data['orders']]
+
+    def test_new_order_is_searchable_after_migrate(self):
+        order_id = self.create_order('Fuite sous evier')
+        self.assertEqual(self.search(self.client_user, 'fuite'), [order_id])
+
+    def test_limit_is_at_least_one(self):
+        first = self.create_order('Fuite sous evier')
+        self.create_order('Fuite de la chasse d\'eau')
+        self.assertEqual(len(self.search(self.client_user, 'fuite', limit=-1)), 1)
+        self.assertEqual(len(self.search(self.client_user, 'fuite', limit=0)), 1)
+        self.assertIn(first, self.search(self.client_user, 'fuite', limit=5))
+
+    def test_search_is_scoped_to_the_requester(self):
+        other_service = Service.objects.create(name='Jardinage', description='Jardinage')
+        order_id = self.create_order('Fuite sous evier')
+        self.create_order('Fuite du tuyau d\'arrosage', service=other_service)
+        other_client = User.objects.create_user(username='other', password='x')
+        provider_user = User.objects.create_user(username='provider', password='x')
+        Provider.objects.create(user=provider_user, service=self.service, location='Tunis', cin='1', is_approved=True)
+
+        self.assertEqual(self.search(other_client, 'fuite'), [])
+        self.assertEqual(self.search(provider_user, 'fuite'), [order_id])
+
+    def test_sqlite_triggers_survive_migrations(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("SQLite only")
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'service_order'")
+            triggers = {name for name, in cursor.fetchall()}
+        self.assertTrue({'service_order_fts_insert', 'service_order_fts_update', 'service_order_fts_delete'} <= triggers)
+
+
+class DuplicateOrderTests(TestCase):
+    def setUp(self):
+        self.service = Service.objects.create(name='Plomberie', description='Plomberie')
+        self.api = APIClient()
+        self.api.force_authenticate(User.objects.create_user(username='client', password='x'))
+        self.order = {
+            'service_id': self.service.id,
+            'title': 'Fuite sous evier',
+            'description': 'Le siphon fuit depuis hier soir',
+            'location': 'Tunis centre',
+            'proposed_price_range_min': '10',
+            'proposed_price_range_max': '50',
+        }
+
+    def test_repost_is_flagged_by_default(self):
+        first = self.api.post('/service/create_order/', self.order, format='json')
+        second = self.api.post('/service/create_order/', self.order, format='json')
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(Order.objects.get(pk=second.data['id']).duplicate_of_id, first.data['id'])
+
+    def test_batch_items_are_checked(self):
+        first = self.api.post('/service/create_order/', self.order, format='json')
+        other = dict(self.order, title='Peinture du salon', description='Deux murs a repeindre en blanc')
+        response = self.api.post('/service/create_orders_batch/', {'orders': [self.order, other]}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['duplicates'], [{'index': 0, 'duplicate_of': first.data['id']}])
+
+        with self.settings(ORDER_DEDUP_ACTION='merge'):
+            response = self.api.post('/service/create_orders_batch/', {'orders': [self.order]}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['created'], [])
+
+
+class MarketplaceTestCase(TestCase):
+    """A service, a client and two providers of that service."""
+
+    def setUp(self):
+        self.service = Service.objects.create(name='Plomberie', description='Plomberie')
+        self.client_user = User.objects.create_user(username='client', password='x')
+        self.providers = [
+            Provider.objects.create(
+                user=User.objects.create_user(username=f'provider{i}', password='x'),
+                service=self.service, location='Tunis', cin=str(i), is_approved=True,
+            )
+            for i in range(2)
+        ]
+
+    def api_for(self, user):
+        api = APIClient()
+        api.force_authenticate(user)
+        return api
+
+    def make_order(self, **fields):
+        return Order.objects.create(**{
+            'client': self.client_user, 'service': self.service, 'title': 'Fuite sous evier',
+            'description': 'Le siphon fuit', 'location': 'Tunis centre',
+            'proposed_price_range_min': Decimal('10'), 'proposed_price_range_max': Decimal('50'),
+            'final_price': Decimal('10'), **fields,
+        })
+
+    def make_offer(self, order, provider, price=Decimal('30'), accepted=True):
+        return offer.objects.create(Order=order, provider=provider, proposed_price=price if accepted else None, accepted=accepted)
+
+
+class AcceptOfferTests(MarketplaceTestCase):
+    def accept(self, user, order, selected_offer):
+        return self.api_for(user).post(
+            '/service/accept_offer/', {'order_id': order.id, 'offer_id': selected_offer.id}, format='json',
+        )
+
+    def test_client_accepts_an_offer(self):
+        order = self.make_order()
+        selected_offer = self.make_offer(order, self.providers[1])
+        response = self.accept(self.client_user, order, selected_offer)
+        self.assertEqual(response.status_code, 200, response.data)
+        order.refresh_from_db()
+        self.assertEqual(order.state, 'accepted')
+        self.assertEqual(order.Confirmed_provider, self.providers[1])
+        self.assertEqual(order.final_price, Decimal('30'))
+
+    def test_only_the_client_or_the_offer_author_may_accept(self):
+        order = self.make_order()
+        selected_offer = self.make_offer(order, self.providers[1])
+        stranger = User.objects.create_user(username='stranger', password='x')
+        for user in (stranger, self.providers[0].user):
+            self.assertEqual(self.accept(user, order, selected_offer).status_code, 403)
+        self.assertEqual(self.accept(self.providers[1].user, order, selected_offer).status_code, 200)
+        order.refresh_from_db()
+        self.assertEqual(order.Confirmed_provider, self.providers[1])
+
+    def test_declined_offer_cannot_be_accepted(self):
+        order = self.make_order()
+        declined = self.make_offer(order, self.providers[1], accepted=False)
+        self.assertEqual(self.accept(self.client_user, order, declined).status_code, 409)
+        order.refresh_from_db()
+        self.assertEqual(order.state, 'pending')
+
+    def test_non_pending_order_cannot_be_accepted(self):
+        for state in ('accepted', 'completed', 'rejected'):
+            order = self.make_order(state=state)
+            response = self.accept(self.client_user, order, self.make_offer(order, self.providers[1]))
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response.data['state'], state)
+
+    def test_competing_accepts_leave_one_winner(self):
+        order = self.make_order()
+        offers = [self.make_offer(order, provider) for provider in self.providers]
+        statuses = [self.accept(provider.user, order, o).status_code for provider, o in zip(self.providers, offers)]
+        self.assertEqual(statuses, [200, 409])
+        order.refresh_from_db()
+        self.assertEqual((order.accepted_offer_id, order.Confirmed_provider), (offers[0].id, self.providers[0]))
+
+
+class StateTransitionTests(MarketplaceTestCase):
+    def post(self, path, order):
+        return self.api_for(self.client_user).post(path, {'order_id': order.id}, format='json')
+
+    def test_transition_is_compare_and_set(self):
+        # Two requests that both read the order while it was pending
+        first = Order.objects.get(pk=self.make_order().pk)
+        second = Order.objects.get(pk=first.pk)
+        transition(first, 'accepted', Confirmed_provider=self.providers[0])
+        with self.assertRaises(StateConflict) as conflict:
+            transition(second, 'rejected')
+        self.assertEqual(conflict.exception.order.state, 'accepted')
+        self.assertEqual(Order.objects.get(pk=first.pk).state, 'accepted')
+
+    def test_complete_requires_an_accepted_order(self):
+        for state in ('pending', 'completed', 'rejected'):
+            response = self.post('/service/complete_order/', self.make_order(state=state))
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response.data['state'], state)
+        order = self.make_order(state='accepted')
+        self.assertEqual(self.post('/service/complete_order/', order).status_code, 200)
+        order.refresh_from_db()
+        self.assertEqual(order.state, 'completed')
+
+    def test_cancel_requires_a_pending_order(self):
+        for state in ('accepted', 'completed', 'rejected'):
+            response = self.post('/service/cancel_order/', self.make_order(state=state))
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response.data['state'], state)
+        order = self.make_order()
+        self.assertEqual(self.post('/service/cancel_order/', order).status_code, 200)
+        order.refresh_from_db()
+        self.assertEqual(order.state, 'rejected')
+
+
+class IdempotencyTests(MarketplaceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.api = self.api_for(self.client_user)
+        self.order = {
+            'service_id': self.service.id, 'title': 'Fuite sous evier', 'description': 'Le siphon fuit depuis hier soir',
+            'location': 'Tunis centre', 'proposed_price_range_min': '10', 'proposed_price_range_max': '50',
+        }
+
+    def create(self, key, **changes):
+        return self.api.post('/service/create_order/', dict(self.order, **changes), format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_first_response(self):
+        first = self.create('k1')
+        retry = self.create('k1')
+        self.assertEqual(first.status_code, 201, first.data)
+        self.assertEqual((retry.status_code, retry.data), (201, first.data))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_replay_keeps_the_view_headers(self):
+        existing = self.make_order(title=self.order['title'], description=self.order['description'])
+        dedup.index_orders([existing])
+        with self.settings(ORDER_DEDUP_ACTION='merge'):
+            first = self.create('k1')
+            retry = self.create('k1')
+        self.assertEqual(first['Duplicate-Of'], str(existing.id))
+        self.assertEqual(retry['Duplicate-Of'], str(existing.id))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+
+    def test_key_reused_for_another_request(self):
+        self.create('k1')
+        self.assertEqual(self.create('k1', title='Peinture du salon').status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_request_in_progress(self):
+        IdempotencyKey.objects.create(
+            user=self.client_user, key='k1', fingerprint='running', expires_at=timezone.now() + timedelta(minutes=1),
+        )
+        response = self.create('k1')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_server_error_rolls_back_and_frees_the_key(self):
+        with mock.patch('service.views.stats.record_orders', side_effect=RuntimeError('boom')):
+            self.assertEqual(self.create('k1').status_code, 500)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.create('k1').status_code, 201)
+
+    def test_sweep_deletes_expired_keys(self):
+        now = timezone.now()
+        for key, expires_at in (('old', now - timedelta(seconds=1)), ('live', now + timedelta(hours=1))):
+            IdempotencyKey.objects.create(user=self.client_user, key=key, fingerprint='x', status_code=201, expires_at=expires_at)
+        call_command('sweep_idempotency_keys', stdout=StringIO())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['live'])
+
+
+@override_settings(IMAGE_VARIANT_WORKERS=0)
+class MediaTestCase(MarketplaceTestCase):
+    """Media files written under a temporary MEDIA_ROOT."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def attach(self, order, content=b'same photo'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return OrderMedia.objects.create(order=order, file=ContentFile(content, name='photo.bin'))
+
+    def delete(self, instance):
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.delete()
+
+    def exists(self, name):
+        return order_media_storage().exists(name)
+
+
+class MediaBlobTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.order = self.make_order()
+
+    def test_same_content_is_stored_once(self):
+        first, second = self.attach(self.order), self.attach(self.make_order())
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(MediaBlob.objects.get().refcount, 2)
+        self.assertEqual(len(os.listdir(os.path.dirname(first.file.path))), 1)
+
+    def test_file_is_removed_with_its_last_reference(self):
+        first, second = self.attach(self.order), self.attach(self.make_order())
+        name = first.file.name
+        self.delete(first)
+        self.assertEqual(MediaBlob.objects.get().refcount, 1)
+        self.assertTrue(self.exists(name))
+        self.delete(second)
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(self.exists(name))
+
+    def test_archived_media_keeps_its_reference(self):
+        media = self.attach(self.order)
+        Order.objects.filter(pk=self.order.pk).update(state='completed')
+        with self.captureOnCommitCallbacks(execute=True):
+            archive.archive_batch([self.order.pk])
+        self.assertEqual(MediaBlob.objects.get().refcount, 1)
+        self.assertTrue(self.exists(media.file.name))
+        self.delete(ArchivedOrderMedia.objects.get())
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(self.exists(media.file.name))
+
+    def test_rolled_back_upload_writes_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                media = OrderMedia.objects.create(order=self.order, file=ContentFile(b'draft', name='draft.bin'))
+                raise RuntimeError
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(self.exists(media.file.name))
+
+
+class KeysetPaginationTests(MarketplaceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.api = self.api_for(self.client_user)
+        self.orders = [self.make_order(title=f'Commande {i}') for i in range(5)]
+        # Newest first, as listed
+        self.expected = [order.id for order in sorted(self.orders, key=lambda o: (o.created_at, o.id), reverse=True)]
+
+    def page(self, url, **params):
+        response = self.api.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def walk(self, **params):
+        ids, page = [], self.page('/service/list_orders/', page_size=2, **params)
+        while True:
+            ids += [order['id'] for order in page['orders']]
+            if not page['next']:
+                return ids
+            page = self.page(page['next'])
+
+    def test_next_links_cover_every_row_once(self):
+        self.assertEqual(self.walk(), self.expected)
+
+    def test_previous_link_returns_the_previous_page(self):
+        first = self.page('/service/list_orders/', page_size=2)
+        self.assertIsNone(first['previous'])
+        second = self.page(first['next'])
+        back = self.page(second['previous'])
+        self.assertEqual([o['id'] for o in back['orders']], [o['id'] for o in first['orders']])
+        self.assertIsNotNone(back['next'])
+
+    def test_invalid_cursor(self):
+        for cursor in ('garbage', 'eyJ2Ijoibm9wZSJ9'):
+            response = self.api.get('/service/list_orders/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
+
+    def test_archived_rows_are_merged(self):
+        archived = self.orders[1::2]
+        Order.objects.filter(pk__in=[o.pk for o in archived]).update(state='completed')
+        archive.archive_batch([o.pk for o in archived])
+        self.assertEqual(self.walk(), [i for i in self.expected if i not in {o.pk for o in archived}])
+        self.assertEqual(self.walk(include_archived='true'), self.expected)
+
+
+class ExportTests(MarketplaceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.orders = [self.make_order(title=f'Commande {i}') for i in range(4)]
+        self.offers = [self.make_offer(order, self.providers[0]) for order in self.orders]
+        self.archived = self.orders[::2]
+        Order.objects.filter(pk__in=[o.pk for o in self.archived]).update(state='completed')
+        archive.archive_batch([o.pk for o in self.archived])
+
+    def export(self, kind, *args):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, f'{kind}.ndjson')
+        call_command('export_data', kind, '--file', path, *args)
+        with open(path, 'rb') as exported:
+            return [orjson.loads(line)['id'] for line in exported]
+
+    def test_archived_rows_are_exported_in_id_order(self):
+        self.assertEqual(self.export('orders'), sorted(o.pk for o in self.orders))
+        self.assertEqual(self.export('offers'), sorted(o.pk for o in self.offers))
+
+    def test_no_archived(self):
+        archived = {o.pk for o in self.archived}
+        self.assertEqual(self.export('orders', '--no-archived'), sorted(o.pk for o in self.orders if o.pk not in archived))
+
+    def test_filters_apply_to_archived_rows(self):
+        self.assertEqual(self.export('orders', '--state', 'completed'), sorted(o.pk for o in self.archived))
+
+
+class ServiceStatsTests(MarketplaceTestCase):
+    def stats_row(self):
+        return ServiceDailyStats.objects.filter(service=self.service).first()
+
+    def test_bumped_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            order = self.make_order()
+            stats.record_orders([order])
+            self.assertIsNone(self.stats_row())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.stats_row().orders_created, 1)
+
+    def test_rolled_back_view_counts_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                stats.record_orders([self.make_order()])
+                transaction.set_rollback(True)
+        self.assertIsNone(self.stats_row())
+
+    def test_acceptance_goes_into_the_histogram(self):
+        order = self.make_order()
+        order.final_price, order.accepted_at = Decimal('30'), timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            stats.record_acceptance(order)
+            stats.record_acceptance(order)
+        row = self.stats_row()
+        self.assertEqual(row.orders_accepted, 2)
+        self.assertEqual(row.accepted_price_total, Decimal('60'))
+        self.assertEqual(row.accepted_prices, {stats.price_bucket(Decimal('30')): 2})
+
+
+class ConditionalGetTests(MarketplaceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.order = self.make_order()
+        self.make_offer(self.order, self.providers[0])
+
+    def assertRevalidates(self, api, url, change):
+        first = api.get(url)
+        self.assertEqual(first.status_code, 200, first.data)
+        etag = first['ETag']
+        cached = api.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], etag)
+        self.assertEqual(api.get(url, HTTP_IF_NONE_MATCH=f'W/{etag}').status_code, 304)
+
+        change()
+        fresh = api.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh['ETag'], etag)
+
+    def test_get_order(self):
+        api = self.api_for(self.providers[0].user)
+        self.assertRevalidates(api, f'/service/order/{self.order.id}/', lambda: self.make_offer(self.order, self.providers[1]))
+
+    def test_get_order_not_found_before_etag(self):
+        api = self.api_for(self.providers[0].user)
+        missing = f'/service/order/{self.order.id + 1000}/'
+        self.assertEqual(api.get(missing, HTTP_IF_NONE_MATCH='*').status_code, 404)
+        etag = api.get(f'/service/order/{self.order.id}/')['ETag']
+        self.order.delete()
+        self.assertEqual(api.get(f'/service/order/{self.order.id}/', HTTP_IF_NONE_MATCH=etag).status_code, 404)
+
+    def test_list_order_offers(self):
+        api = self.api_for(self.client_user)
+        self.assertRevalidates(
+            api, f'/service/list_order_offers/{self.order.id}/', lambda: self.make_offer(self.order, self.providers[1]),
+        )
+
+    def test_list_client_orders(self):
+        api = self.api_for(self.client_user)
+        self.assertRevalidates(api, '/service/list_orders/', lambda: self.make_order(title='Autre fuite'))
+
+    def test_etag_depends_on_the_query(self):
+        api = self.api_for(self.client_user)
+        etag = api.get('/service/list_orders/')['ETag']
+        response = api.get('/service/list_orders/', {'page_size': 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ArchiveTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.order = self.make_order(state='completed')
+        self.offers = [
+            self.make_offer(self.order, self.providers[0]),
+            self.make_offer(self.order, self.providers[1], accepted=False),
+        ]
+        Order.objects.filter(pk=self.order.pk).update(accepted_offer=self.offers[0])
+
+    def age(self, order, days):
+        Order.objects.filter(pk=order.pk).update(updated_at=timezone.now() - timedelta(days=days))
+
+    def archive(self, *orders):
+        with self.captureOnCommitCallbacks(execute=True):
+            return archive.archive_batch([order.pk for order in orders])
+
+    def test_rows_keep_their_ids(self):
+        media = self.attach(self.order)
+        self.assertEqual(self.archive(self.order), (1, 2, 1))
+
+        archived = ArchivedOrder.objects.get()
+        self.assertEqual((archived.id, archived.title, archived.state), (self.order.id, self.order.title, 'completed'))
+        self.assertEqual(archived.accepted_offer_id, self.offers[0].id)
+        self.assertEqual(sorted(archived.offers.values_list('id', flat=True)), sorted(o.id for o in self.offers))
+        self.assertEqual(list(archived.media.values_list('id', 'file')), [(media.id, media.file.name)])
+
+    def test_hot_rows_are_deleted(self):
+        self.attach(self.order)
+        self.archive(self.order)
+        self.assertFalse(Order.objects.filter(pk=self.order.pk).exists())
+        self.assertFalse(offer.objects.exists())
+        self.assertFalse(OrderMedia.objects.exists())
+
+    def test_non_terminal_orders_are_skipped(self):
+        pending = self.make_order()
+        self.assertEqual(self.archive(pending), (0, 0, 0))
+        self.assertTrue(Order.objects.filter(pk=pending.pk).exists())
+        self.assertFalse(ArchivedOrder.objects.exists())
+
+    def test_archived_media_take_their_references(self):
+        shared = [self.attach(self.order), self.attach(self.order)]
+        other = self.attach(self.order, b'other photo')
+        self.attach(self.make_order())
+        self.archive(self.order)
+
+        # Two archived rows and one hot row on the shared file, one archived row on the other
+        self.assertEqual(MediaBlob.objects.get(name=shared[0].file.name).refcount, 3)
+        self.assertEqual(MediaBlob.objects.get(name=other.file.name).refcount, 1)
+        self.assertTrue(self.exists(other.file.name))
+        self.delete(ArchivedOrder.objects.get())
+        self.assertEqual(MediaBlob.objects.get(name=shared[0].file.name).refcount, 1)
+        self.assertFalse(self.exists(other.file.name))
+
+    def test_listing_merges_archived_orders(self):
+        api = self.api_for(self.client_user)
+        recent = self.make_order(title='Autre fuite')
+        before = api.get('/service/list_orders/').data['orders']
+        self.archive(self.order)
+
+        self.assertEqual([o['id'] for o in api.get('/service/list_orders/').data['orders']], [recent.id])
+        self.assertEqual(api.get('/service/list_orders/', {'include_archived': 'true'}).data['orders'], before)
+
+    def test_command(self):
+        pending, recent, older = self.make_order(), self.make_order(state='rejected'), self.make_order(state='rejected')
+        for order in (self.order, pending, older):
+            self.age(order, 100)
+
+        out = StringIO()
+        call_command('archive_orders', '--days', '30', '--dry-run', stdout=out)
+        self.assertIn('2 order(s) to archive.', out.getvalue())
+        self.assertFalse(ArchivedOrder.objects.exists())
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archive_orders', '--days', '30', '--batch-size', '1', stdout=out)
+        self.assertIn('Archived 2 orders, 2 offers and 0 media.', out.getvalue())
+        self.assertEqual(sorted(ArchivedOrder.objects.values_list('id', flat=True)), sorted([self.order.id, older.id]))
+        self.assertEqual(sorted(Order.objects.values_list('id', flat=True)), sorted([pending.id, recent.id]))
@@ -5,8 +5,10 @@ urlpatterns = [
 
     # for clients
     path('create_order/', views.create_order, name='create_order'),
+    path('create_orders_batch/', views.create_orders_batch, name='create_orders_batch'),
     path('list_order_offers/<int:order_id>/', views.list_order_offers, name='list_order_offers'),
     path('list_service/', views.list_service, name='list_service'),
+    path('list_service/cache_stats/', views.service_cache_stats, name='service_cache_stats'),
     path('list_orders/', views.list_client_orders, name='list_orders'),
 
     # final offer acceptance
@@ -21,5 +23,10 @@ urlpatterns = [
     
     path('create_offer/', views.create_offer, name='create_offer'),
     path('order/<int:order_id>/', views.get_order, name='order'),
+    path('orders/search/', views.search_orders_view, name='search_orders'),
+    path('export/<str:kind>/', views.export_data, name='export_data'),
+    path('stats/', views.service_stats, name='service_stats'),
+    path('stats/<int:service_id>/', views.service_stats_detail, name='service_stats_detail'),
+    path('<int:service_id>/price_hint/', views.service_price_hint, name='service_price_hint'),
 
 ]
\ No newline at end of file
@@ -1,16 +1,34 @@
+import json
+
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
-from service.serializers import OrderSerializer, OfferSerializer, OrderMediaSerializer, ServiceSerializer
-from .models import Service, Order, offer, OrderMedia
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from service.serializers import OrderSerializer, OrderListSerializer, OfferSerializer, OrderMediaSerializer, ServiceSerializer
+from .models import Service, Order, offer, OrderMedia, ProviderFeedEntry, ArchivedOrder
+from . import dedup, export, feed, price_hints, realtime, stats
+from .state_machine import StateConflict, transition
+from .search import search_orders
+from .ranking import rank_feed
+from .cache import get_service, list_services, service_cache
+from .etags import not_modified, offers_etag, orders_etag
+from .idempotency import idempotent
 from provider.models import Provider
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Q,Subquery, OuterRef
 from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, ValidationError
+from serviceLink.pagination import KeysetPagination
+from serviceLink.projection import SparseFieldset, value_of
+from serviceLink.thumbnails import schedule_variants
+from serviceLink.geo import distance_km, locate, within_cells_q
 
 # Créer une commande
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def create_order(request):
     try:
         client = request.user  # Le client est l'utilisateur connecté
@@ -21,9 +39,10 @@ def create_order(request):
         proposed_price_range_min = request.data.get('proposed_price_range_min')
         proposed_price_range_max = request.data.get('proposed_price_range_max')
         provider = request.data.get('Confirmed_provider')
+        allow_duplicate = dedup.allows_duplicate(request.data)
 
         # Vérifier si le service existe
-        service = Service.objects.filter(id=service_id).first()
+        service = get_service(service_id)
         if not service:
             return Response({"error": "Service not found."}, status=status.HTTP_404_NOT_FOUND)
         # Créer un dictionnaire de données pour la validation
@@ -44,14 +63,30 @@ def create_order(request):
         # Sérialiser et valider les données
         order_serializer = OrderSerializer(data=order_data)
         if order_serializer.is_valid():
-            # Si les données sont valides, créer la commande
-            order = order_serializer.save()
-
-            # Gérer les fichiers multimédias
-            media_files = request.FILES.getlist('media')
-            if media_files:
-                for media_file in media_files:
-                    OrderMedia.objects.create(order=order, file=media_file)
+            # Commande quasi identique encore ouverte chez ce client (index MinHash/LSH, service.dedup)
+            fingerprint = dedup.Fingerprint(title, description, location)
+            duplicate = dedup.check(client.id, service.id, fingerprint, allow_duplicate)
+            if duplicate and settings.ORDER_DEDUP_ACTION == 'merge':
+                # Pas de nouvelle commande : on renvoie celle qui existe déjà (200 au lieu de 201)
+                existing = Order.objects.for_listing().get(pk=duplicate[0].pk)
+                return Response(OrderSerializer(existing).data, status=status.HTTP_200_OK, headers={'Duplicate-Of': str(existing.pk)})
+
+            with transaction.atomic():
+                # Si les données sont valides, créer la commande
+                order = order_serializer.save(duplicate_of=duplicate[0] if duplicate else None)
+                dedup.index_orders([order], [fingerprint])
+
+                # Gérer les fichiers multimédias
+                media_files = request.FILES.getlist('media')
+                if media_files:
+                    for media_file in media_files:
+                        media = OrderMedia.objects.create(order=order, file=media_file)
+                        schedule_variants(media.file.name)
+
+                # Publier la commande dans le fil des fournisseurs du service (et en direct via WebSocket)
+                feed.sync_order(order)
+                realtime.publish_added([order])
+                stats.record_orders([order])
 
             return Response(order_serializer.data, status=status.HTTP_201_CREATED)
         else:
@@ -61,6 +96,104 @@ def create_order(request):
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+ORDER_BATCH_MAX_SIZE = 100
+MAX_RADIUS_KM = 500
+MAX_RANKED_ORDERS = 200
+
+# Créer plusieurs commandes en une seule requête
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_orders_batch(request):
+    """
+    Create up to ORDER_BATCH_MAX_SIZE orders at once.
+
+    Body: {"orders": [...]} with the same fields as create_order. With multipart,
+    "orders" is a JSON string and the files of item i are sent as "media_<i>".
+    Valid items are inserted with bulk_create in one transaction, invalid ones
+    are reported by index. Near-duplicates of open orders are checked per item
+    like in create_order: flagged, or listed in "duplicates" instead of being
+    created when ORDER_DEDUP_ACTION is "merge".
+    """
+    try:
+        client = request.user
+        items = request.data.get('orders')
+        if isinstance(items, str):
+            items = json.loads(items)
+        if not isinstance(items, list) or not items:
+            return Response({"error": "orders must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > ORDER_BATCH_MAX_SIZE:
+            return Response({"error": f"At most {ORDER_BATCH_MAX_SIZE} orders per batch."}, status=status.HTTP_400_BAD_REQUEST)
+
+        orders_data = [
+            {
+                'client': client.id,
+                'service': item.get('service_id'),
+                'title': item.get('title'),
+                'description': item.get('description'),
+                'location': item.get('location'),
+                'Confirmed_provider': item.get('Confirmed_provider') or None,
+                'proposed_price_range_min': item.get('proposed_price_range_min'),
+                'proposed_price_range_max': item.get('proposed_price_range_max'),
+                'final_price': item.get('proposed_price_range_min'),
+                'accepted_offer': None,
+            }
+            for item in items
+        ]
+
+        # Valider chaque commande avec le sérialiseur du lot, sans faire échouer tout le lot
+        batch_serializer = OrderSerializer(data=orders_data, many=True)
+        valid, errors = [], []
+        for index, data in enumerate(orders_data):
+            try:
+                valid.append((index, batch_serializer.child.run_validation(data)))
+            except ValidationError as e:
+                errors.append({"index": index, "errors": e.detail})
+        if not valid:
+            return Response({"created": [], "duplicates": [], "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Commandes quasi identiques déjà ouvertes, vérifiées élément par élément comme dans create_order
+        to_create, fingerprints, duplicates = [], [], []
+        for index, validated_data in valid:
+            fingerprint = dedup.Fingerprint(validated_data['title'], validated_data['description'], validated_data['location'])
+            duplicate = dedup.check(client.id, validated_data['service'].id, fingerprint, dedup.allows_duplicate(items[index]))
+            if duplicate:
+                duplicates.append({"index": index, "duplicate_of": duplicate[0].id})
+                if settings.ORDER_DEDUP_ACTION == 'merge':
+                    continue
+                validated_data['duplicate_of'] = duplicate[0]
+            to_create.append((index, validated_data))
+            fingerprints.append(fingerprint)
+
+        with transaction.atomic():
+            # bulk_create contourne Order.save() : géolocaliser explicitement
+            orders = Order.objects.bulk_create(locate(Order(**validated_data)) for _, validated_data in to_create)
+            media = OrderMedia.objects.bulk_create(
+                OrderMedia(order=order, file=media_file)
+                for (index, _), order in zip(to_create, orders)
+                for media_file in request.FILES.getlist(f'media_{index}')
+            )
+            for item in media:
+                schedule_variants(item.file.name)
+            feed.add_orders(orders)
+            realtime.publish_added(orders)
+            stats.record_orders(orders)
+            dedup.index_orders(orders, fingerprints)
+
+        created = Order.objects.for_listing().filter(id__in=[order.id for order in orders]).order_by('id')
+        if errors:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED if orders else status.HTTP_200_OK
+        return Response(
+            {"created": OrderSerializer(created, many=True).data, "duplicates": duplicates, "errors": errors},
+            status=response_status,
+        )
+
+    except (ValueError, AttributeError) as e:
+        return Response({"error": f"Invalid batch: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 # Lister toutes les offres pour une commande spécifique
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -72,47 +205,82 @@ def list_order_offers(request, order_id):
             return Response({"error": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
 
         # Récupérer les offres pour la commande
-        offers = offer.objects.filter(order=order)
-        offer_serializer = OfferSerializer(offers, many=True)
+        offers = offer.objects.filter(Order=order).select_related('provider__user')
+
+        # Rien n'a changé depuis la dernière requête du client : 304 sans sérialiser
+        etag = offers_etag(request, offers)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+
+        # ?fields= / ?expand= : projection .values() sans instancier les offres
+        fieldset = SparseFieldset.from_request(request, OfferSerializer)
+        paginator = KeysetPagination()
+        if fieldset:
+            page = paginator.paginate_queryset(fieldset.apply(offers, keys=paginator.keys), request)
+            data = fieldset.serialize(page)
+        else:
+            page = paginator.paginate_queryset(offers, request)
+            data = OfferSerializer(page, many=True).data
 
-        return Response({"offers": offer_serializer.data}, status=status.HTTP_200_OK)
+        response = paginator.get_paginated_response(data, results_key='offers')
+        response['ETag'] = etag
+        return response
 
+    except NotFound as e:
+        return Response({"error": str(e.detail)}, status=status.HTTP_404_NOT_FOUND)
+    except ValidationError as e:
+        return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # Accepter une offre
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def accept_offer(request):
     try:
         order_id = request.data.get('order_id')
         offer_id = request.data.get('offer_id')
-        provider = request.user.provider  # L'utilisateur connecté est le fournisseur
-
-        if not provider:
-            return Response({"error": "Provider not found."}, status=status.HTTP_404_NOT_FOUND)
 
         # Récupérer la commande et l'offre
-        order = Order.objects.filter(id=order_id).first()
-        selected_offer = offer.objects.filter(id=offer_id).first()  # Renommer la variable pour éviter le conflit
+        order = Order.objects.for_listing().filter(id=order_id).first()
+        selected_offer = offer.objects.select_related('provider__user').filter(id=offer_id).first()  # Renommer la variable pour éviter le conflit
 
         if not order:
             return Response({"error": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        if not selected_offer:
+        if not selected_offer or selected_offer.Order_id != order.id:
             return Response({"error": "Offer not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        # Accepter l'offre et mettre à jour l'état de la commande
-        order.accepted_offer = selected_offer
-        order.STATES = 'accepted'
-        order.final_price = selected_offer.proposed_price
-        order.Confirmed_provider = provider
-        order.save()
+        # Seuls le client de la commande et le fournisseur auteur de l'offre peuvent l'accepter
+        if request.user.id not in (order.client_id, selected_offer.provider.user_id):
+            return Response({"error": "You are not allowed to accept this offer."}, status=status.HTTP_403_FORBIDDEN)
+
+        # Une offre déclinée (reject_offer) n'a pas de prix et ne peut pas être acceptée
+        if not selected_offer.accepted:
+            return Response({"error": "This offer was declined and cannot be accepted."}, status=status.HTTP_409_CONFLICT)
+
+        # Accepter l'offre : pending -> accepted en un seul UPDATE conditionnel
+        with transaction.atomic():
+            transition(
+                order, 'accepted',
+                accepted_offer=selected_offer,
+                final_price=selected_offer.proposed_price,
+                Confirmed_provider=selected_offer.provider,
+                accepted_at=timezone.now(),
+            )
+            stats.record_acceptance(order)
+            price_hints.record_price(order.service_id, selected_offer.proposed_price)
+            feed.sync_order(order)
+            realtime.publish_removed(order)
 
         # Sérialiser la commande mise à jour
         order_serializer = OrderSerializer(order)
         return Response(order_serializer.data, status=status.HTTP_200_OK)
 
+    except StateConflict as e:
+        return Response({"error": str(e), "state": e.order.state}, status=status.HTTP_409_CONFLICT)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -124,31 +292,82 @@ def list_provider_available_orders(request):
         user = request.user
         provider = Provider.objects.get(user=user)
 
-        # Récupérer l'ID du service du fournisseur
-        service_id = provider.service.id
-
-        # Récupérer les commandes en attente pour le service du fournisseur où Confirmed_provider est soit None, soit le fournisseur authentifié
-        # et filtrer les commandes qui n'ont pas d'offre avec ce fournisseur
-        orders = Order.objects.filter(
-            Q(service=service_id) & (Q(Confirmed_provider=None) | Q(Confirmed_provider=provider))
-        ).exclude(
-            id__in=Subquery(
-                offer.objects.filter(provider=provider, order=OuterRef('id')).values('Order')
-            )
-        ).order_by('-created_at')
-
-        # Sérialiser les données des commandes
-        order_serializer = OrderSerializer(orders, many=True)
-
-        return Response({"orders": order_serializer.data}, status=status.HTTP_200_OK)
+        # Le fil est maintenu par service.feed : un simple parcours d'index sur (provider, created_at)
+        entries = ProviderFeedEntry.objects.filter(provider=provider)
+        fieldset = SparseFieldset.from_request(request, OrderListSerializer)
+
+        # Filtre de proximité optionnel : ?radius_km=…[&lat=…&lng=…], centré par défaut sur le fournisseur
+        radius_km = request.query_params.get('radius_km')
+        if radius_km is not None:
+            try:
+                radius_km = float(radius_km)
+                latitude = float(request.query_params.get('lat', provider.latitude))
+                longitude = float(request.query_params.get('lng', provider.longitude))
+            except (TypeError, ValueError):
+                return Response(
+                    {"error": "radius_km, lat and lng must be numbers; lat/lng are required when the provider location is unknown."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if not (0 < radius_km <= MAX_RADIUS_KM and -90 <= latitude <= 90 and -180 <= longitude <= 180):
+                return Response(
+                    {"error": f"radius_km must be in (0, {MAX_RADIUS_KM}] and lat/lng valid coordinates."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            # Parcours d'index sur (provider, geohash) puis filtre exact par distance (haversine)
+            entries = entries.filter(within_cells_q('geohash', latitude, longitude, radius_km)).annotate(
+                distance_km=distance_km('latitude', 'longitude', latitude, longitude),
+            ).filter(distance_km__lte=radius_km)
+
+        # Classement par pertinence : ?sort=relevance[&limit=k] renvoie le top k, sans pagination
+        if request.query_params.get('sort') == 'relevance':
+            try:
+                limit = min(max(int(request.query_params.get('limit', 20)), 1), MAX_RANKED_ORDERS)
+                if radius_km is None and 'lat' in request.query_params and 'lng' in request.query_params:
+                    latitude, longitude = float(request.query_params['lat']), float(request.query_params['lng'])
+                elif radius_km is None:
+                    latitude = longitude = None
+            except ValueError:
+                return Response({"error": "limit, lat and lng must be numbers."}, status=status.HTTP_400_BAD_REQUEST)
+            ranked = rank_feed(provider, k=limit, latitude=latitude, longitude=longitude, radius_km=radius_km)
+            data = _serialize_orders(fieldset, [order_id for order_id, _, _ in ranked])
+            for item, (_, score, distance) in zip(data, ranked):
+                item['score'] = round(score, 4)
+                if distance is not None:
+                    item['distance_km'] = round(distance, 2)
+            return Response({"orders": data}, status=status.HTTP_200_OK)
+
+        # Paginer (du plus récent au plus ancien) puis sérialiser les commandes
+        paginator = KeysetPagination(ordering=('-created_at', '-order_id'))
+        page = paginator.paginate_queryset(entries, request)
+        data = _serialize_orders(fieldset, [entry.order_id for entry in page])
+        if radius_km is not None:
+            for item, entry in zip(data, page):
+                item['distance_km'] = round(entry.distance_km, 2)
+
+        return paginator.get_paginated_response(data, results_key='orders')
 
     except Provider.DoesNotExist:
         return Response({"error": "Provider not found."}, status=status.HTTP_404_NOT_FOUND)
+    except NotFound as e:
+        return Response({"error": str(e.detail)}, status=status.HTTP_404_NOT_FOUND)
+    except ValidationError as e:
+        return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _serialize_orders(fieldset, order_ids):
+    """Representations of the given orders, in that order, for the requested fieldset."""
+    if fieldset:
+        rows = {value_of(row, 'id'): row for row in fieldset.apply(Order.objects.filter(id__in=order_ids), keys=('id',))}
+        return fieldset.serialize([rows[order_id] for order_id in order_ids])
+    orders = Order.objects.for_summary().in_bulk(order_ids)
+    return OrderListSerializer([orders[order_id] for order_id in order_ids], many=True).data
+
 # Créer une offre pour une commande
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def create_offer(request):
     try:
         provider = request.user.provider  # L'utilisateur connecté est le fournisseur
@@ -172,7 +391,11 @@ def create_offer(request):
         # Sérialiser et valider les données de l'offre
         offer_serializer = OfferSerializer(data=offer_data)
         if offer_serializer.is_valid():
-            offer = offer_serializer.save()
+            with transaction.atomic():
+                offer = offer_serializer.save()
+                order.record_offer(offer)
+                stats.record_offer(order, offer)
+                feed.remove_for_provider(order, provider)
             return Response(offer_serializer.data, status=status.HTTP_201_CREATED)
         else:
             # En cas d'erreurs de validation, renvoyer les erreurs
@@ -181,18 +404,67 @@ def create_offer(request):
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+# Recherche plein texte dans les commandes
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_orders_view(request):
+    try:
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({"error": "The q parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
+        service_id = request.query_params.get('service')
+        if service_id and not service_id.isdigit():
+            return Response({"error": "Invalid service."}, status=status.HTTP_400_BAD_REQUEST)
+        state = request.query_params.get('state')
+        if state and state not in dict(Order.STATES):
+            return Response({"error": "Invalid state."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(min(int(request.query_params.get('limit', 20)), 100), 1)
+        except ValueError:
+            limit = 20
+
+        # Un fournisseur cherche dans les commandes de son service, un client dans les siennes
+        client_id = None
+        if not request.user.is_staff:
+            provider = Provider.objects.filter(user=request.user).first()
+            if not provider:
+                client_id = request.user.id
+            elif service_id and int(service_id) != provider.service_id:
+                return Response({"orders": []}, status=status.HTTP_200_OK)
+            else:
+                service_id = provider.service_id
+
+        results = search_orders(text, service_id=service_id, state=state, client_id=client_id, limit=limit)
+        orders = OrderListSerializer([order for order, _ in results], many=True).data
+        for item, (_, rank) in zip(orders, results):
+            item['rank'] = rank
+        return Response({"orders": orders}, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 # Lister les services
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_service(request):
     try:
-        services = Service.objects.all()
-        service_serializer = ServiceSerializer(services, many=True)
-        return Response(service_serializer.data, status=status.HTTP_200_OK)
-
+        # Catalogue servi depuis le cache (LRU local puis cache partagé)
+        services = list_services()
+        fieldset = SparseFieldset.from_request(request, ServiceSerializer)
+        if fieldset:
+            services = [{name: item[name] for name in fieldset.names} for item in services]
+        return Response(services, status=status.HTTP_200_OK)
+
+    except ValidationError as e:
+        return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+# Statistiques du cache du catalogue
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def service_cache_stats(request):
+    return Response(service_cache.get_stats(), status=status.HTTP_200_OK)
+
 # list order by client
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -200,9 +472,40 @@ def list_client_orders(request):
     try:
         client = request.user
         # Récupérer les commandes du client en ordre décroissant de la date de création
-        orders = Order.objects.filter(client=client).order_by('-created_at')
-        order_serializer = OrderSerializer(orders, many=True)
-        return Response(order_serializer.data, status=status.HTTP_200_OK)
+        orders = Order.objects.filter(client=client)
+        # ?include_archived=true : ajoute les commandes archivées (service.archive), fusionnées par date
+        archived = None
+        if request.query_params.get('include_archived', '').lower() in ('1', 'true', 'yes'):
+            archived = ArchivedOrder.objects.filter(client=client)
+
+        etag = orders_etag(request, orders, archived)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+
+        # ?fields= / ?expand= : projection .values() sans instancier les commandes
+        fieldset = SparseFieldset.from_request(request, OrderListSerializer)
+        paginator = KeysetPagination()
+        if fieldset:
+            querysets = [fieldset.apply(orders, keys=paginator.keys)]
+            if archived is not None:
+                querysets.append(fieldset.apply(archived, keys=paginator.keys))
+            page = paginator.paginate_querysets(querysets, request)
+            data = fieldset.serialize(page)
+        else:
+            querysets = [orders.for_summary()]
+            if archived is not None:
+                querysets.append(archived.select_related('client').prefetch_related('media'))
+            page = paginator.paginate_querysets(querysets, request)
+            # Les modèles archivés ont les mêmes champs : le même serializer convient
+            data = OrderListSerializer(page, many=True).data
+        response = paginator.get_paginated_response(data, results_key='orders')
+        response['ETag'] = etag
+        return response
+    except NotFound as e:
+        return Response({"error": str(e.detail)}, status=status.HTTP_404_NOT_FOUND)
+    except ValidationError as e:
+        return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
@@ -217,11 +520,20 @@ def get_order(request, order_id):
         user = request.user
         provider = Provider.objects.get(user=user)
         if provider:
-            order = Order.objects.filter(id=order_id).first()
+            orders = Order.objects.filter(id=order_id)
+            # 404 avant l'ETag : un If-None-Match (ou *) ne doit pas masquer une commande inexistante
+            if not orders.exists():
+                return Response({"error": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
+            etag = orders_etag(request, orders)
+            cached = not_modified(request, etag)
+            if cached:
+                return cached
+
+            order = orders.for_listing().first()
             if not order:
                 return Response({"error": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
             order_serializer = OrderSerializer(order)
-            return Response(order_serializer.data, status=status.HTTP_200_OK)
+            return Response(order_serializer.data, status=status.HTTP_200_OK, headers={'ETag': etag})
     except Provider.DoesNotExist:
         return Response({"error": "Provider not found."}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
@@ -258,7 +570,11 @@ def reject_offer(request):
         # Sérialiser et valider les données de l'offre
         offer_serializer = OfferSerializer(data=offer_data)
         if offer_serializer.is_valid():
-            offer = offer_serializer.save()
+            with transaction.atomic():
+                offer = offer_serializer.save()
+                order.record_offer(offer)
+                stats.record_offer(order, offer)
+                feed.remove_for_provider(order, provider)
             return Response(offer_serializer.data, status=status.HTTP_201_CREATED)
         else:
             # En cas d'erreurs de validation, renvoyer les erreurs
@@ -275,13 +591,16 @@ def reject_offer(request):
 def complete_order(request):
     try:
         order_id = request.data.get('order_id')
-        order = Order.objects.filter(id=order_id).first()
+        order = Order.objects.for_listing().filter(id=order_id).first()
         if not order:
             return Response({"error": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
-        order.STATES = 'completed'
-        order.save()
+        with transaction.atomic():
+            transition(order, 'completed')
+            feed.sync_order(order)
         order_serializer = OrderSerializer(order)
         return Response(order_serializer.data, status=status.HTTP_200_OK)
+    except StateConflict as e:
+        return Response({"error": str(e), "state": e.order.state}, status=status.HTTP_409_CONFLICT)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
@@ -292,13 +611,99 @@ def complete_order(request):
 def cancel_order(request):
     try:
         order_id = request.data.get('order_id')
-        order = Order.objects.filter(id=order_id).first()
+        order = Order.objects.for_listing().filter(id=order_id).first()
         if not order:
             return Response({"error": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
-        order.STATES = 'rejected'
-        order.save()
+        with transaction.atomic():
+            transition(order, 'rejected')
+            feed.sync_order(order)
+            realtime.publish_removed(order)
         order_serializer = OrderSerializer(order)
         return Response(order_serializer.data, status=status.HTTP_200_OK)
+    except StateConflict as e:
+        return Response({"error": str(e), "state": e.order.state}, status=status.HTTP_409_CONFLICT)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+
+
+# Export complet en flux (NDJSON ou CSV, gzip en option) réservé aux administrateurs
+# ?service=&state=&since=&until=&output=ndjson|csv&gzip=true&include_archived=false
+# (les commandes et offres archivées sont incluses par défaut)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_data(request, kind):
+    try:
+        params = request.query_params
+        names, records = export.rows(
+            kind,
+            service=params.get('service'),
+            state=params.get('state'),
+            since=params.get('since'),
+            until=params.get('until'),
+            include_archived=params.get('include_archived', 'true').lower() in ('1', 'true', 'yes'),
+        )
+        gzip = params.get('gzip', '').lower() in ('1', 'true', 'yes')
+        return export.streaming_response(request, kind, names, records, params.get('output', 'ndjson'), gzip)
+    except ValidationError as e:
+        return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+
+# Statistiques du marché par service, lues dans les agrégats journaliers (service.stats)
+# ?since=AAAA-MM-JJ&until=AAAA-MM-JJ (30 derniers jours par défaut)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def service_stats(request):
+    try:
+        since, until = stats.period(request.query_params)
+        by_service = {}
+        for row in stats.rollups(since, until):
+            by_service.setdefault((row['service'], row['service__name']), []).append(row)
+        services = [
+            {"service": service_id, "name": name, **stats.summarize(rows)}
+            for (service_id, name), rows in sorted(by_service.items())
+        ]
+        return Response({"since": since, "until": until, "services": services}, status=status.HTTP_200_OK)
+    except ValidationError as e:
+        return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# Série journalière d'un service
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def service_stats_detail(request, service_id):
+    try:
+        service = get_service(service_id)
+        if not service:
+            return Response({"error": "Service not found."}, status=status.HTTP_404_NOT_FOUND)
+        since, until = stats.period(request.query_params)
+        rows = list(stats.rollups(since, until, service=service_id))
+        return Response({
+            "service": service_id,
+            "since": since,
+            "until": until,
+            "total": stats.summarize(rows),
+            "days": [{"day": row['day'], **stats.summarize([row])} for row in rows],
+        }, status=status.HTTP_200_OK)
+    except ValidationError as e:
+        return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+
+# Fourchette de prix indicative d'un service : quartiles des prix acceptés (service.price_hints)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def service_price_hint(request, service_id):
+    try:
+        if not get_service(service_id):
+            return Response({"error": "Service not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"service": service_id, **price_hints.hint(service_id)}, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    
\ No newline at end of file
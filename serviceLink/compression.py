@@ -0,0 +1,140 @@
+"""
+Response compression negotiated through Accept-Encoding.
+
+Brotli is preferred when the `brotli` package is installed and the client
+accepts it, then gzip. Regular responses are compressed only from
+COMPRESSION_MIN_SIZE bytes on; streaming responses are always compressed
+chunk by chunk, with a flush after each chunk so that clients still receive
+rows as soon as they are produced. Already encoded responses, partial content,
+file responses (media, sendfile) and non-textual types are left untouched.
+"""
+import re
+import zlib
+
+from django.conf import settings
+from django.http import FileResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = re.compile(
+    r'^(text/|application/(json|x-ndjson|javascript|xml|problem\+json|vnd\.api\+json)|image/svg\+xml)'
+)
+_accept_re = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def negotiate(accept_encoding):
+    """'br', 'gzip' or None for an Accept-Encoding header value."""
+    weights = {}
+    for part in accept_encoding.split(','):
+        match = _accept_re.match(part)
+        if not match:
+            continue
+        try:
+            weights[match[1].lower()] = float(match[2]) if match[2] else 1.0
+        except ValueError:
+            continue
+    candidates = ('br', 'gzip') if brotli is not None else ('gzip',)
+    best, best_weight = None, 0.0
+    for coding in candidates:
+        weight = weights.get(coding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+class _Gzip:
+    def __init__(self):
+        self._compressor = zlib.compressobj(getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6), zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4))
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+COMPRESSORS = {'gzip': _Gzip, 'br': _Brotli}
+
+
+def compress(data, coding):
+    compressor = COMPRESSORS[coding]()
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_stream(chunks, coding):
+    compressor = COMPRESSORS[coding]()
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def compress_async_stream(chunks, coding):
+    compressor = COMPRESSORS[coding]()
+    async for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        coding = self.coding_for(request, response)
+        if coding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = compress_async_stream(response.streaming_content, coding)
+            else:
+                response.streaming_content = compress_stream(response.streaming_content, coding)
+            del response.headers['Content-Length']
+        else:
+            response.content = compress(response.content, coding)
+            response.headers['Content-Length'] = str(len(response.content))
+
+        # The compressed body is a different representation: strong validators become weak
+        etag = response.headers.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = coding
+        return response
+
+    def coding_for(self, request, response):
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.status_code != 200 or response.has_header('Content-Encoding'):
+            return None
+        if isinstance(response, FileResponse):
+            return None
+        if not COMPRESSIBLE_TYPES.match(response.get('Content-Type', '')):
+            return None
+        if not response.streaming and len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', 1024):
+            return None
+        return negotiate(request.headers.get('Accept-Encoding', ''))
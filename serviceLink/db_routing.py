@@ -0,0 +1,90 @@
+"""
+Read replicas with read-your-writes stickiness.
+
+Replicas are the DATABASES aliases listed in DATABASE_REPLICAS (built from the
+DATABASE_REPLICA_URLS env var). ReplicaRouter sends writes, migrations and, by
+default, reads to "default"; only safe HTTP requests (GET, HEAD, OPTIONS) let
+ReplicaPinningMiddleware send reads to a replica, picked at random once per
+request so that all its queries (e.g. an ETag and the page it describes) see
+the same snapshot. Management commands, WebSocket consumers and other code
+outside of a request stay on the primary.
+
+A user who writes (any unsafe method) receives a cookie that keeps their
+following requests on the primary for REPLICA_PIN_SECONDS, longer than the
+expected replication lag, so they always read what they just wrote.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PIN_COOKIE = 'db_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Replica alias serving the reads of the current request, None for the primary
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+@contextmanager
+def pin_to_primary():
+    """Read from the primary inside the block, e.g. right before a decisive write."""
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {'default', *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        return db not in replicas()
+
+
+class ReplicaPinningMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+        write = request.method not in SAFE_METHODS
+        aliases = replicas()
+        use_replica = aliases and not write and not self.is_pinned(request, pin_seconds)
+        token = _read_alias.set(random.choice(aliases) if use_replica else None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+
+        if write and replicas():
+            response.set_cookie(
+                PIN_COOKIE, str(int(time.time()) + pin_seconds),
+                max_age=pin_seconds, httponly=True, samesite='Lax', secure=request.is_secure(),
+            )
+        return response
+
+    def is_pinned(self, request, pin_seconds):
+        try:
+            until = int(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            return False
+        # Never trust a cookie further than one pin window ahead
+        return time.time() < min(until, time.time() + pin_seconds)
@@ -0,0 +1,128 @@
+"""
+Offline gazetteer: resolves free-text locations to coordinates without any
+network geocoding.
+
+The location text is normalized (case, accents, punctuation) and the longest
+known place name it contains wins, so "Rue de Marseille, La Marsa, Tunis"
+resolves to La Marsa rather than Tunis.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+# (latitude, longitude) of governorate capitals, main cities and Greater Tunis districts
+PLACES = {
+    # Grand Tunis
+    'tunis': (36.8065, 10.1815),
+    'ariana': (36.8625, 10.1956),
+    'ben arous': (36.7531, 10.2189),
+    'manouba': (36.8101, 10.0956),
+    'la marsa': (36.8782, 10.3247),
+    'marsa': (36.8782, 10.3247),
+    'carthage': (36.8528, 10.3233),
+    'sidi bou said': (36.8687, 10.3416),
+    'la goulette': (36.8181, 10.3050),
+    'le kram': (36.8333, 10.3167),
+    'gammarth': (36.9167, 10.2833),
+    'le bardo': (36.8092, 10.1406),
+    'bardo': (36.8092, 10.1406),
+    'les berges du lac': (36.8380, 10.2400),
+    'berges du lac': (36.8380, 10.2400),
+    'lac 1': (36.8330, 10.2330),
+    'lac 2': (36.8450, 10.2720),
+    'el menzah': (36.8400, 10.1800),
+    'menzah': (36.8400, 10.1800),
+    'ennasr': (36.8600, 10.1650),
+    'el manar': (36.8400, 10.1580),
+    'manar': (36.8400, 10.1580),
+    'la soukra': (36.8750, 10.2500),
+    'soukra': (36.8750, 10.2500),
+    'raoued': (36.9300, 10.1800),
+    'el mourouj': (36.7350, 10.2100),
+    'mourouj': (36.7350, 10.2100),
+    'rades': (36.7686, 10.2753),
+    'megrine': (36.7686, 10.2333),
+    'ezzahra': (36.7439, 10.3083),
+    'hammam lif': (36.7297, 10.3411),
+    'hammam chott': (36.7167, 10.3667),
+    'mohamedia': (36.6744, 10.1578),
+    'fouchana': (36.6986, 10.1694),
+    'den den': (36.8042, 10.1150),
+    'oued ellil': (36.8333, 10.0500),
+    'bab saadoun': (36.8050, 10.1700),
+    'bab souika': (36.8050, 10.1650),
+    'el omrane': (36.8250, 10.1650),
+    'cite el khadra': (36.8300, 10.1900),
+    'centre ville': (36.8000, 10.1800),
+    # Nord
+    'bizerte': (37.2744, 9.8739),
+    'menzel bourguiba': (37.1536, 9.7856),
+    'mateur': (37.0400, 9.6650),
+    'beja': (36.7256, 9.1817),
+    'jendouba': (36.5011, 8.7802),
+    'tabarka': (36.9544, 8.7581),
+    'le kef': (36.1822, 8.7147),
+    'kef': (36.1822, 8.7147),
+    'siliana': (36.0849, 9.3708),
+    'zaghouan': (36.4029, 10.1429),
+    # Cap Bon
+    'nabeul': (36.4561, 10.7376),
+    'hammamet': (36.4000, 10.6167),
+    'yasmine hammamet': (36.3700, 10.5400),
+    'kelibia': (36.8475, 11.0939),
+    'korba': (36.5786, 10.8586),
+    'grombalia': (36.6000, 10.5000),
+    'soliman': (36.6964, 10.4917),
+    'menzel temime': (36.7833, 10.9833),
+    # Sahel et Centre
+    'sousse': (35.8256, 10.6360),
+    'hammam sousse': (35.8600, 10.6000),
+    'port el kantaoui': (35.8920, 10.5950),
+    'msaken': (35.7333, 10.5833),
+    'enfidha': (36.1333, 10.3833),
+    'monastir': (35.7643, 10.8113),
+    'ksar hellal': (35.6431, 10.8911),
+    'moknine': (35.6333, 10.9000),
+    'mahdia': (35.5047, 11.0622),
+    'el jem': (35.3000, 10.7167),
+    'kairouan': (35.6781, 10.0963),
+    'kasserine': (35.1676, 8.8365),
+    'sidi bouzid': (35.0382, 9.4849),
+    # Sud
+    'sfax': (34.7406, 10.7603),
+    'sakiet ezzit': (34.8000, 10.7667),
+    'gabes': (33.8815, 10.0982),
+    'medenine': (33.3549, 10.5055),
+    'djerba': (33.8075, 10.8451),
+    'houmt souk': (33.8750, 10.8575),
+    'midoun': (33.8081, 11.0000),
+    'zarzis': (33.5036, 11.1122),
+    'tataouine': (32.9297, 10.4518),
+    'gafsa': (34.4250, 8.7842),
+    'metlaoui': (34.3167, 8.4000),
+    'tozeur': (33.9197, 8.1335),
+    'nefta': (33.8731, 7.8772),
+    'kebili': (33.7044, 8.9690),
+    'douz': (33.4667, 9.0167),
+}
+
+_separator_re = re.compile(r'[^a-z0-9]+')
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode().lower()
+    return f" {_separator_re.sub(' ', text).strip()} "
+
+
+# Longest names first so the most specific place wins
+_NAMES = sorted(PLACES, key=len, reverse=True)
+
+
+@lru_cache(maxsize=4096)
+def resolve(location):
+    """(latitude, longitude) for a free-text location, or None if unknown."""
+    text = normalize(location)
+    for name in _NAMES:
+        if f' {name} ' in text:
+            return PLACES[name]
+    return None
@@ -0,0 +1,134 @@
+"""
+Geohash encoding and proximity helpers.
+
+Rows carry a geohash of their coordinates in an indexed CharField. A radius
+query is answered by cells_covering(): the 3x3 block of cells, at the finest
+precision whose cells are still larger than the radius, around the center.
+Each cell is a prefix, i.e. an index range scan; the few candidates outside
+the circle are then dropped with an exact haversine check (distance_km()).
+"""
+import math
+
+from django.db.models import ExpressionWrapper, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 2 * math.pi * EARTH_RADIUS_KM / 360
+GEOHASH_PRECISION = 9
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    bits, bit_count, even, result = 0, 0, True, []
+    while len(result) < precision:
+        value, interval = (longitude, lng_range) if even else (latitude, lat_range)
+        middle = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            result.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(result)
+
+
+def cell_size_km(precision, latitude=0.0):
+    """(height, width) of a geohash cell in km at `latitude`."""
+    lng_bits = math.ceil(5 * precision / 2)
+    lat_bits = 5 * precision // 2
+    height = 180 / 2 ** lat_bits * KM_PER_DEGREE
+    width = 360 / 2 ** lng_bits * KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01)
+    return height, width
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def cells_covering(latitude, longitude, radius_km):
+    """Geohash prefixes whose union contains the circle around the point."""
+    precision = 1
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size_km(candidate, latitude)
+        if min(height, width) >= radius_km:
+            precision = candidate
+            break
+    height, width = cell_size_km(precision, latitude)
+    dlat, dlng = height / KM_PER_DEGREE, width / KM_PER_DEGREE / max(math.cos(math.radians(latitude)), 0.01)
+    cells = set()
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            lat = max(min(latitude + i * dlat, 89.999999), -89.999999)
+            lng = (longitude + j * dlng + 180) % 360 - 180
+            cells.add(encode(lat, lng, precision))
+    return sorted(cells)
+
+
+def _next_prefix(cell):
+    """Smallest geohash greater than every hash starting with `cell` (None if none)."""
+    cell = cell.rstrip(_BASE32[-1])
+    if not cell:
+        return None
+    return cell[:-1] + _BASE32[_BASE32.index(cell[-1]) + 1]
+
+
+def within_cells_q(field, latitude, longitude, radius_km):
+    """
+    Q object selecting rows whose `field` geohash falls in the covering cells.
+
+    Prefixes are expressed as [cell, next cell) ranges rather than LIKE so a
+    plain btree index on the column is usable whatever its collation/opclass.
+    """
+    query = Q()
+    for cell in cells_covering(latitude, longitude, radius_km):
+        upper = _next_prefix(cell)
+        cell_q = Q(**{f'{field}__gte': cell})
+        if upper:
+            cell_q &= Q(**{f'{field}__lt': upper})
+        query |= cell_q
+    return query
+
+
+def distance_km(lat_field, lng_field, latitude, longitude):
+    """Haversine distance in km from a point to the row's coordinates, as a SQL expression."""
+    lat1, lng1 = math.radians(latitude), math.radians(longitude)
+    lat2, lng2 = Radians(lat_field), Radians(lng_field)
+    a = (
+        Power(Sin((lat2 - Value(lat1)) / 2), 2)
+        + Value(math.cos(lat1)) * Cos(lat2) * Power(Sin((lng2 - Value(lng1)) / 2), 2)
+    )
+    return ExpressionWrapper(2 * EARTH_RADIUS_KM * ASin(Sqrt(a)), output_field=FloatField())
+
+
+def locate(instance):
+    """Fill latitude/longitude/geohash of a model instance from its `location` text."""
+    from .gazetteer import resolve
+
+    coordinates = resolve(instance.location)
+    if coordinates is None:
+        instance.latitude = instance.longitude = None
+        instance.geohash = ''
+    else:
+        instance.latitude, instance.longitude = coordinates
+        instance.geohash = encode(*coordinates)
+    return instance
+
+
+def backfill(queryset, batch_size=1000):
+    """Locate every row of `queryset` (migrations use this on historical models)."""
+    batch = []
+    for instance in queryset.only('pk', 'location').iterator(chunk_size=batch_size):
+        batch.append(locate(instance))
+        if len(batch) >= batch_size:
+            queryset.model.objects.bulk_update(batch, ['latitude', 'longitude', 'geohash'])
+            batch = []
+    if batch:
+        queryset.model.objects.bulk_update(batch, ['latitude', 'longitude', 'geohash'])
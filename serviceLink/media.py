@@ -0,0 +1,158 @@
+"""
+Serving of uploaded media files.
+
+Replaces django.conf.urls.static for MEDIA_URL with a view that supports
+single byte ranges, strong ETags and long-lived immutable caching of
+content-addressed files (their name contains the SHA-256 of their content).
+
+MEDIA_SERVE_MODE selects how the bytes are sent:
+- "django": FileResponse under WSGI, which gunicorn turns into os.sendfile
+  through wsgi.file_wrapper, and an async chunk iterator under daphne.
+- "x-accel": only headers are produced and nginx sends the file itself via
+  X-Accel-Redirect to MEDIA_ACCEL_REDIRECT_PREFIX.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags
+
+CHUNK_SIZE = 64 * 1024
+_sha256_re = re.compile(r'(?:^|/)[0-9a-f]{64}[^/]*$')
+_range_re = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """Read-only view of `length` bytes of an open file, starting at `start`."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def serve_media(request, path):
+    path = posixpath.normpath(path).lstrip('/')
+    if not path.startswith(tuple(settings.MEDIA_SERVE_PREFIXES)):
+        raise Http404("File not found.")
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (OSError, SuspiciousFileOperation):
+        raise Http404("File not found.")
+    if not os.path.isfile(full_path):
+        raise Http404("File not found.")
+
+    size = stat.st_size
+    if _sha256_re.search(path):
+        # Content-addressed: the name changes whenever the bytes do
+        etag = f'"{os.path.basename(path)}"'
+        cache_control = 'public, max-age=31536000, immutable'
+    else:
+        etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+        cache_control = 'public, max-age=3600'
+
+    headers = {
+        'ETag': etag,
+        'Cache-Control': cache_control,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+    }
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if 'Range' in request.headers and (not if_range or if_range == etag):
+        byte_range = parse_range(request.headers['Range'], size)
+        if byte_range == 'unsatisfiable':
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    if settings.MEDIA_SERVE_MODE == 'x-accel':
+        # nginx serves the bytes (and the Range header) from an internal location
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + path
+    else:
+        start, end = byte_range or (0, size - 1)
+        response = _stream(request, full_path, start, end - start + 1, content_type)
+        if byte_range:
+            response.status_code = 206
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def parse_range(header, size):
+    """(start, end) for a single byte range, None to ignore it, 'unsatisfiable'."""
+    match = _range_re.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        # Malformed or multiple ranges: serve the whole file
+        return None
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if length == 0:
+            return 'unsatisfiable'
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        return 'unsatisfiable'
+    return start, end
+
+
+def _stream(request, full_path, start, length, content_type):
+    file = open(full_path, 'rb')
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(_aiter_file(file, start, length), content_type=content_type)
+    else:
+        # Picked up by wsgi.file_wrapper (os.sendfile under gunicorn)
+        response = FileResponse(FileRange(file, start, length), content_type=content_type)
+    response['Content-Length'] = length
+    return response
+
+
+async def _aiter_file(file, start, length):
+    read = sync_to_async(file.read, thread_sensitive=False)
+    try:
+        await sync_to_async(file.seek, thread_sensitive=False)(start)
+        while length > 0:
+            chunk = await read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
@@ -0,0 +1,141 @@
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from .projection import value_of
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opaque cursor pagination on a (field, id) pair.
+
+    Pages are selected with a WHERE on the last seen key instead of an OFFSET,
+    so deep pages cost the same as the first one. Works on .values() querysets
+    too, as long as both ordering columns are selected.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def __init__(self, ordering=('-created_at', '-id'), page_size=None):
+        self.ordering = ordering
+        self.page_size = page_size or api_settings.PAGE_SIZE or 50
+
+    @property
+    def keys(self):
+        """Columns every row must carry for cursors to be encoded."""
+        return tuple(field.lstrip('-') for field in self.ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_querysets([queryset], request)
+
+    def paginate_querysets(self, querysets, request):
+        """
+        One page over several querysets with the same ordering columns (e.g. hot
+        and archived orders), merged in Python. Each queryset is read with the
+        same cursor and limit, so the cost does not depend on the page depth.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request, querysets[0])
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(self._flip(f) for f in ordering)
+        rows = []
+        for queryset in querysets:
+            if position is not None:
+                queryset = queryset.filter(self._after(position, ordering))
+            rows.extend(queryset.order_by(*ordering)[:size + 1])
+        if len(querysets) > 1:
+            keys = tuple(f.lstrip('-') for f in ordering)
+            rows.sort(key=lambda row: tuple(value_of(row, key) for key in keys), reverse=ordering[0].startswith('-'))
+
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data, results_key='results'):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            results_key: data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    # Cursor encoding
+
+    def encode_cursor(self, instance, reverse):
+        field, pk = (f.lstrip('-') for f in self.ordering)
+        value = value_of(instance, field)
+        payload = {
+            'v': value.isoformat() if hasattr(value, 'isoformat') else value,
+            'pk': value_of(instance, pk),
+            'r': int(reverse),
+        }
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, queryset):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        field, pk = (f.lstrip('-') for f in self.ordering)
+        opts = queryset.model._meta
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            value = opts.get_field(field).to_python(payload['v'])
+            pk_value = opts.get_field(pk).to_python(payload['pk'])
+            reverse = bool(payload.get('r'))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return (value, pk_value), reverse
+
+    # Helpers
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else '-' + field
+
+    @staticmethod
+    def _after(position, ordering):
+        """Rows strictly after `position` when sorted by `ordering`."""
+        (field, pk), (value, pk_value) = ordering, position
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        field, pk = field.lstrip('-'), pk.lstrip('-')
+        return Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'{pk}__{lookup}': pk_value})
@@ -0,0 +1,182 @@
+"""
+Sparse fieldsets for read endpoints: ?fields= and ?expand=.
+
+- ?fields=id,title,client_name keeps only those fields of the serializer.
+- ?expand=media,offers adds nested fields (nested serializers, many-to-many
+  and method fields); with ?fields= absent every plain field is kept, so an
+  empty ?expand= means "plain fields only".
+- Without either parameter the endpoint answers exactly as before.
+
+When every selected field maps to a column (model fields, foreign key ids,
+dotted sources over forward relations such as client.username) the selection
+is compiled into a .values() projection and rows are rendered straight from
+the returned dicts, with the serializer fields' own to_representation(), so
+no model instance is built. Otherwise the queryset is narrowed with .only()
+plus the select/prefetch_related the nested fields need, and the regular
+serializer runs with the other fields removed.
+"""
+from functools import lru_cache
+
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def value_of(row, name):
+    """Attribute of a model instance or key of a .values() row."""
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def _parse_list(value):
+    return [name for name in (part.strip() for part in value.split(',')) if name]
+
+
+@lru_cache(maxsize=None)
+def _compile(serializer_class):
+    """{name: column path or None} for every field of the serializer, in declaration order."""
+    serializer = serializer_class()
+    model = serializer.Meta.model
+    return {name: _column_path(model, field) for name, field in serializer.fields.items()}
+
+
+def _column_path(model, field):
+    if isinstance(field, (serializers.BaseSerializer, ManyRelatedField, serializers.SerializerMethodField,
+                          serializers.FileField)) or field.source == '*':
+        return None
+    hops = field.source.split('.')
+    for hop in hops[:-1]:
+        try:
+            model_field = model._meta.get_field(hop)
+        except Exception:
+            return None
+        if not (model_field.concrete and (model_field.many_to_one or model_field.one_to_one)):
+            return None
+        model = model_field.related_model
+    try:
+        model_field = model._meta.get_field(hops[-1])
+    except Exception:
+        # Properties and other attributes need an instance
+        return None
+    if not model_field.concrete or model_field.many_to_many:
+        return None
+    if model_field.is_relation and not isinstance(field, RelatedField):
+        return None
+    return '__'.join(hops)
+
+
+class SparseFieldset:
+    def __init__(self, serializer_class, names=None, context=None):
+        self.serializer_class = serializer_class
+        self.columns = _compile(serializer_class)
+        self.names = list(self.columns) if names is None else names
+        self.context = context or {}
+        self.requested = names is not None
+
+    def __bool__(self):
+        return self.requested
+
+    @classmethod
+    def from_request(cls, request, serializer_class):
+        """Selection from the query string; ValidationError on unknown field names."""
+        params = request.query_params
+        if FIELDS_PARAM not in params and EXPAND_PARAM not in params:
+            return cls(serializer_class, context={'request': request})
+        columns = _compile(serializer_class)
+        nested = [name for name, path in columns.items() if path is None]
+
+        fields = _parse_list(params.get(FIELDS_PARAM, ''))
+        expand = _parse_list(params.get(EXPAND_PARAM, ''))
+        unknown = [name for name in fields if name not in columns]
+        if unknown:
+            raise ValidationError({FIELDS_PARAM: f"Unknown field(s): {', '.join(unknown)}."})
+        unknown = [name for name in expand if name not in nested]
+        if unknown:
+            raise ValidationError({EXPAND_PARAM: f"Not expandable: {', '.join(unknown)}. Choices: {', '.join(nested)}."})
+
+        selected = set(fields) if FIELDS_PARAM in params else {name for name in columns if name not in nested}
+        selected.update(expand)
+        return cls(serializer_class, [name for name in columns if name in selected], context={'request': request})
+
+    @property
+    def flat(self):
+        return all(self.columns[name] is not None for name in self.names)
+
+    def apply(self, queryset, keys=()):
+        """
+        Project `queryset` onto the selection. `keys` are extra columns the
+        caller needs on each row (pagination ordering, lookups by id).
+        """
+        if self.flat:
+            paths = dict.fromkeys([*keys, *(self.columns[name] for name in self.names)])
+            return queryset.values(*paths)
+
+        model = queryset.model
+        only, select, prefetch = set(keys), set(), []
+        serializer = self.serializer_class()
+        for name in self.names:
+            path = self.columns[name]
+            if path is not None:
+                only.add(path)
+                if '__' in path:
+                    select.add(path.rsplit('__', 1)[0])
+                continue
+            field = serializer.fields[name]
+            lookups = getattr(serializer.Meta, 'expand', {}).get(name, [field.source])
+            for lookup in lookups:
+                if lookup == '*' or not _is_relation(model, lookup):
+                    # Method fields and the like may read anything from the instance
+                    return queryset
+                if isinstance(lookup, Prefetch) or not _is_forward(model, lookup):
+                    prefetch.append(lookup)
+                else:
+                    select.add(lookup)
+                    only.add(lookup.split('__', 1)[0])
+        if select:
+            # select_related() without arguments would follow every foreign key
+            queryset = queryset.select_related(*select)
+        return queryset.prefetch_related(*prefetch).only(*only)
+
+    def serialize(self, rows):
+        """Representations of `rows` (from apply()) restricted to the selection."""
+        if rows and isinstance(rows[0], dict):
+            fields = self.serializer_class(context=self.context).fields
+            columns = [(name, self.columns[name], _converter(fields[name])) for name in self.names]
+            return [
+                {
+                    name: row[path] if convert is None or row[path] is None else convert(row[path])
+                    for name, path, convert in columns
+                }
+                for row in rows
+            ]
+        serializer = self.serializer_class(rows, many=True, context=self.context)
+        fields = serializer.child.fields
+        for name in [name for name in fields if name not in self.names]:
+            fields.pop(name)
+        return serializer.data
+
+
+def _converter(field):
+    """to_representation() for a column value, or None when the value is already its representation."""
+    if isinstance(field, (RelatedField, serializers.BooleanField, serializers.IntegerField)):
+        return None
+    if type(field) in (serializers.CharField, serializers.ReadOnlyField) or isinstance(field, serializers.ChoiceField):
+        return None
+    return field.to_representation
+
+
+def _is_relation(model, lookup):
+    if isinstance(lookup, Prefetch):
+        return True
+    try:
+        return model._meta.get_field(lookup.split('__', 1)[0]).is_relation
+    except Exception:
+        return False
+
+
+def _is_forward(model, lookup):
+    field = model._meta.get_field(lookup.split('__', 1)[0])
+    return field.concrete and (field.many_to_one or field.one_to_one)
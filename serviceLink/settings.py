@@ -23,8 +23,12 @@ ASGI_APPLICATION = "serviceLink.asgi.application"
 MEDIA_URL = '/' 
 MEDIA_ROOT = os.path.join(BASE_DIR, '')
 ALLOWED_HOSTS = ["*"]
+# Redis si REDIS_URL est défini (nécessaire dès qu'il y a plusieurs processus), sinon mémoire locale
 CHANNEL_LAYERS = {
     'default': {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {'hosts': [os.getenv("REDIS_URL")]},
+    } if os.getenv("REDIS_URL") else {
         'BACKEND': 'channels.layers.InMemoryChannelLayer',
     },
 }
@@ -48,8 +52,25 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'serviceLink.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.getenv('API_PAGE_SIZE', 50)),
+    # JSON via orjson (serviceLink.renderers), même sortie que le JSONRenderer de DRF
+    'DEFAULT_RENDERER_CLASSES': [
+        'serviceLink.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'serviceLink.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# Compression gzip/brotli des réponses selon Accept-Encoding (serviceLink.compression)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))  # octets, sauf réponses en streaming
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 4
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -71,8 +92,15 @@ INSTALLED_APPS = [
     #"whitenoise.runserver_nostatic",
 ]
 
+# Commandes bench_* : elles créent et suppriment des données dans la base configurée,
+# donc disponibles seulement en développement avec ENABLE_BENCHMARKS=1
+if DEBUG and os.getenv("ENABLE_BENCHMARKS"):
+    INSTALLED_APPS.append('benchmarks')
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'serviceLink.compression.CompressionMiddleware',
+    'serviceLink.db_routing.ReplicaPinningMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add this just after SecurityMiddleware
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -136,6 +164,7 @@ CORS_ALLOW_METHODS = [
     'PATCH'
 ]
 CORS_ALLOW_CREDENTIALS = True
+CORS_EXPOSE_HEADERS = ['ETag']
 
 ROOT_URLCONF = 'serviceLink.urls'
 
@@ -167,6 +196,19 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 DATABASES = {
     "default": dj_database_url.config(default=DATABASE_URL, conn_max_age=1800),
 }
+
+# Réplicas en lecture (URLs séparées par des virgules), utilisées par les requêtes GET.
+# Après une écriture, un cookie garde l'utilisateur sur la base principale pendant REPLICA_PIN_SECONDS.
+# En local : DATABASE_URL=sqlite:////tmp/primary.sqlite3 DATABASE_REPLICA_URLS=sqlite:////tmp/replica.sqlite3
+# puis `python manage.py sync_sqlite_replicas` pour recopier la base principale.
+DATABASE_REPLICAS = []
+for index, url in enumerate(filter(None, os.getenv("DATABASE_REPLICA_URLS", "").split(",")), start=1):
+    alias = f"replica_{index}"
+    DATABASES[alias] = dj_database_url.parse(url.strip(), conn_max_age=1800)
+    DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['serviceLink.db_routing.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 10))
 # DATABASES = {
 #     'default': {
 #         'ENGINE': 'django.db.backends.sqlite3',
@@ -175,6 +217,56 @@ DATABASES = {
 # }
 
 
+# Cache partagé : Redis si REDIS_URL est défini (nécessite le paquet redis), sinon mémoire locale
+REDIS_URL = os.getenv("REDIS_URL")
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    } if REDIS_URL else {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+}
+SERVICE_CACHE_LOCAL_TTL = int(os.getenv("SERVICE_CACHE_LOCAL_TTL", 30))
+SERVICE_CACHE_SHARED_TTL = int(os.getenv("SERVICE_CACHE_SHARED_TTL", 3600))
+
+# Fichiers envoyés écrits sur disque et hachés au fil de l'eau (médias des commandes adressés par contenu)
+FILE_UPLOAD_HANDLERS = ['service.storage.HashingFileUploadHandler']
+
+# Variantes WebP des images (miniatures), générées en arrière-plan par un pool de processus
+IMAGE_VARIANT_WIDTHS = tuple(int(w) for w in os.getenv("IMAGE_VARIANT_WIDTHS", "160,480,1080").split(","))
+IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", 2))
+
+# Service des médias : "django" (sendfile via wsgi.file_wrapper / itération async sous daphne)
+# ou "x-accel" (nginx envoie le fichier depuis une location interne)
+MEDIA_SERVE_MODE = os.getenv("MEDIA_SERVE_MODE", "django")
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/")
+# MEDIA_ROOT est la racine du projet : seuls ces dossiers sont servis
+MEDIA_SERVE_PREFIXES = ('order_media/', 'profile/', 'proofs/', 'derivatives/')
+
+# Classement par pertinence du fil fournisseur (service.ranking)
+RANKING_FEATURE_TTL = int(os.getenv("RANKING_FEATURE_TTL", 30))  # secondes, cache des tableaux par service
+RANKING_WEIGHTS = {'price': 0.35, 'distance': 0.3, 'recency': 0.2, 'competition': 0.15}
+RANKING_DISTANCE_SCALE_KM = 10
+RANKING_RECENCY_HALF_LIFE_HOURS = 48
+# Suggestion de prix par service (service.price_hints) : nombre minimal de prix acceptés
+PRICE_HINT_MIN_SAMPLES = 5
+
+# Détection des commandes quasi identiques d'un même client (service.dedup) :
+# "flag" (défaut) crée la commande en la marquant, "merge" renvoie la commande existante, "off" désactive
+ORDER_DEDUP_ACTION = os.getenv("ORDER_DEDUP_ACTION", "flag")
+ORDER_DEDUP_WINDOW_DAYS = 7
+ORDER_DEDUP_THRESHOLD = 0.8  # similarité de Jaccard minimale
+
+# Archivage des commandes terminées (completed, rejected) : `python manage.py archive_orders`
+ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", 90))  # jours depuis la dernière modification
+ARCHIVE_BATCH_SIZE = 500
+
+# En-tête Idempotency-Key sur les POST de création (service.idempotency)
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", 24 * 3600))  # secondes de rejeu de la réponse
+IDEMPOTENCY_LOCK_TIMEOUT = 60  # secondes avant de considérer une requête en cours comme abandonnée
+
+
 # Add this line of code to prevent error caused by Django 40 version about trusted origins 
 # CSRF_TRUSTED_ORIGINS = ['https://proj_integ_backend.up.railway.app']
 
@@ -0,0 +1,130 @@
+"""
+Resized WebP derivatives of uploaded images (order media, profile pictures).
+
+A source file `<name>` gets one variant per width in IMAGE_VARIANT_WIDTHS,
+stored as `derivatives/<name>.w<width>.webp` next to the other media. Variants
+are rendered in a process pool after the upload is committed, and any variant
+still missing when it is first requested is rendered on the spot by
+serve_variant().
+"""
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import Http404
+from django.utils._os import safe_join
+
+logger = logging.getLogger(__name__)
+
+VARIANT_PREFIX = 'derivatives/'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tif', '.tiff')
+_variant_re = re.compile(r'^(?P<source>.+)\.w(?P<width>\d+)\.webp$')
+_executor = None
+
+
+def variant_widths():
+    return getattr(settings, 'IMAGE_VARIANT_WIDTHS', (160, 480, 1080))
+
+
+def is_image(name):
+    return bool(name) and os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def variant_name(name, width):
+    return f'{VARIANT_PREFIX}{name}.w{width}.webp'
+
+
+def variant_urls(file):
+    """{width: url} for an image FieldFile, {} for other files."""
+    if not file or not is_image(file.name):
+        return {}
+    return {str(width): default_storage.url(variant_name(file.name, width)) for width in variant_widths()}
+
+
+def render_variants(source_path, targets, quality=80):
+    """Render (width, path) targets from source_path. Runs in worker processes."""
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        for width, path in targets:
+            if os.path.exists(path):
+                continue
+            variant = image
+            if image.width > width:
+                variant = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write next to the target and rename, so a half-written file is never served
+            # (unique per process and thread: serve_variant renders in request threads)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            variant.save(tmp_path, 'WEBP', quality=quality, method=4)
+            os.replace(tmp_path, path)
+
+
+def _targets(name, widths):
+    return [(width, safe_join(settings.MEDIA_ROOT, variant_name(name, width))) for width in widths]
+
+
+def _get_executor():
+    global _executor
+    workers = getattr(settings, 'IMAGE_VARIANT_WORKERS', 2)
+    if workers <= 0:
+        return None
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=workers)
+    return _executor
+
+
+def schedule_variants(name):
+    """Render every variant of `name` in the background once the transaction commits."""
+    if not is_image(name):
+        return
+
+    def submit():
+        executor = _get_executor()
+        if executor is None:
+            return
+        future = executor.submit(render_variants, safe_join(settings.MEDIA_ROOT, name), _targets(name, variant_widths()))
+        future.add_done_callback(_log_failure(name))
+
+    transaction.on_commit(submit)
+
+
+def _log_failure(name):
+    def callback(future):
+        if future.exception():
+            logger.error(f"Variant generation failed for {name}: {future.exception()}")
+    return callback
+
+
+def serve_variant(request, name):
+    """Serve derivatives/<name>, rendering it first if it does not exist yet."""
+    from .media import serve_media
+
+    match = _variant_re.match(name)
+    if not match or int(match['width']) not in variant_widths() or not is_image(match['source']):
+        raise Http404("Unknown variant.")
+    source, width = match['source'], int(match['width'])
+    try:
+        source_path = safe_join(settings.MEDIA_ROOT, source)
+        path = safe_join(settings.MEDIA_ROOT, variant_name(source, width))
+    except SuspiciousFileOperation:
+        raise Http404("Unknown variant.")
+
+    if not os.path.exists(path):
+        if not os.path.isfile(source_path):
+            raise Http404("Source image not found.")
+        try:
+            render_variants(source_path, [(width, path)])
+        except Exception as e:
+            logger.error(f"Variant generation failed for {source}: {e}")
+            raise Http404("Variant could not be generated.")
+    return serve_media(request, variant_name(source, width))